@@ -1,17 +1,16 @@
-from pydantic import BaseModel, ValidationError, field_validator
-from datetime import datetime
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from datetime import date, datetime
 from typing import Literal
 import openai
 import json
-from groq import Groq
+import re
 import os
 from dotenv import load_dotenv
+from llm_client import chat_completion
+from observability import timed
 
 load_dotenv()
 
-API_KEY = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=API_KEY)
-
 
 # 🔷 Pydantic schema
 class AccommodationRequest(BaseModel):
@@ -71,19 +70,85 @@ Return ONLY a JSON object in this format:
 
 
 
-def extract_query_data(user_query: str) -> dict:
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_query}
-        ],
-        temperature=0,
-        max_completion_tokens=1024,
-        top_p=1,
-        stream=False,  # disable streaming for simplicity
-        stop=None,
-    )
+# 🔷 Combined prompt: classification + extraction in one round trip
+combined_system_prompt = """
+You are an assistant that reads a travel query, classifies it and extracts structured fields.
+Return ONLY a JSON object in this format:
+
+{
+  "intent": "trip_planning|general_info",
+  "fields": {
+    "destination": str,
+    "check_in": "YYYY-MM-DD",
+    "check_out": "YYYY-MM-DD",
+    "guests": int,
+    "min_budget": float,
+    "max_budget": float,
+    "standard": "economy|standard|luxury"
+  }
+}
+
+## "intent" is "trip_planning" if the user is asking to plan/book a trip with details like destination, dates, guests, budget, etc.
+## Or "general_info" if the user is just asking for information or advice without booking. In that case "fields" is null.
+## Convert dates to YYYY-MM-DD ISO format. Budgets should be numbers.
+## If information is missing, make reasonable assumptions.
+## Do not include any explanations, notes, or markdown formatting. Only output the JSON object.
+"""
+
+
+class QueryUnderstanding(BaseModel):
+    intent: Literal['trip_planning', 'general_info']
+    fields: AccommodationRequest | None = None
+
+    @model_validator(mode="after")
+    def validate_fields_present(self):
+        if self.intent == "trip_planning" and self.fields is None:
+            raise ValueError("fields are required for trip_planning")
+        return self
+
+
+async def classify_and_extract(user_query: str) -> QueryUnderstanding:
+    """
+    Classify the query and extract its fields with a single LLM call.
+    Raises ValueError if the output isn't valid JSON or fails validation, so
+    callers can fall back to `classify_intent` + `extract_query_data`.
+    """
+    with timed("llm", "classify_and_extract"):
+        completion = await chat_completion(
+            model="meta-llama/llama-4-scout-17b-16e-instruct",
+            messages=[
+                {"role": "system", "content": combined_system_prompt},
+                {"role": "user", "content": user_query}
+            ],
+            temperature=0,
+            max_completion_tokens=1024,
+            top_p=1,
+            response_format={"type": "json_object"},
+        )
+
+    content = completion.choices[0].message.content.strip()
+    if content.startswith("```") and content.endswith("```"):
+        content = content.strip("`").strip()
+    try:
+        return QueryUnderstanding.model_validate_json(content)
+    except ValidationError as e:
+        raise ValueError(f"Invalid combined extraction output: {e}") from e
+
+
+async def extract_query_data(user_query: str) -> dict:
+    with timed("llm", "extract"):
+        completion = await chat_completion(
+            model="meta-llama/llama-4-scout-17b-16e-instruct",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_query}
+            ],
+            temperature=0,
+            max_completion_tokens=1024,
+            top_p=1,
+            stream=False,  # disable streaming for simplicity
+            stop=None,
+        )
 
     content = completion.choices[0].message.content.strip()
     # ✅ Remove wrapping backticks if present
@@ -96,3 +161,227 @@ def extract_query_data(user_query: str) -> dict:
         raise ValueError(f"Could not parse JSON: {content}")
 
 
+
+
+# 🔷 Rule-based fast path
+# Handles the common "luxury stay in Dubai from Aug 10 to Aug 15 for 2 guests,
+# budget between 1000 and 3000" shape without an LLM call. It only returns a
+# result when every field was stated explicitly; anything ambiguous goes to the LLM.
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+STANDARD_KEYWORDS = {
+    "luxury": r"luxury|luxurious|upscale|high-end|five-star|5-star|5 star",
+    "economy": r"economy|cheap|affordable|low-cost|backpack(?:er|ing)?|budget-friendly",
+    "standard": r"standard|mid-range|midrange|moderate",
+}
+
+_MONTH = r"(?:" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s*\d{4})?"
+_DATE = rf"(?:\d{{4}}-\d{{2}}-\d{{2}}|{_MONTH}\s+{_DAY}{_YEAR}|{_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR})"
+_RANGE_SEP = r"\s*(?:to|until|till|through|thru|-|–)\s*"
+DATE_RANGE_RE = re.compile(rf"(?P<start>{_DATE}){_RANGE_SEP}(?P<end>{_DATE}|{_DAY}{_YEAR})", re.IGNORECASE)
+DESTINATION_RE = re.compile(r"\b(?:in|to|at|visit|visiting|around)\s+((?:[A-Z][\w'’.-]*)(?:\s+(?:[A-Z][\w'’.-]*|de|del|la|le|of))*)")
+GUESTS_RE = re.compile(
+    r"\b(\d+|" + "|".join(NUMBER_WORDS) + r")\s+(?:guests?|people|persons?|adults?|travell?ers|pax)\b",
+    re.IGNORECASE,
+)
+# The boundaries keep "1200 kid friendly" from reading as 1.2M and "1 and 15 Aug" from backtracking to "1 and 1".
+_AMOUNT = r"\$?\s?(\d[\d,]*(?:\.\d+)?)(?:\s?(k)\b|\b)"
+BUDGET_RANGE_RES = [
+    re.compile(rf"between\s+{_AMOUNT}\s*(?:and|-|–|to)\s*{_AMOUNT}(?!\s*{_MONTH})", re.IGNORECASE),
+    re.compile(rf"budget[^\d$]{{0,25}}{_AMOUNT}\s*(?:-|–|to)\s*{_AMOUNT}(?!\s*{_MONTH})", re.IGNORECASE),
+    re.compile(rf"\${_AMOUNT[3:]}\s*(?:-|–|to)\s*{_AMOUNT}(?!\s*{_MONTH})", re.IGNORECASE),
+]
+# The budget patterns read amounts as a total in USD; these mean they aren't.
+PER_UNIT_RE = re.compile(
+    r"\b(?:per|a|an|each)\s+(?:night|day|person|head|guest|adult|room)\b|/\s*(?:night|nt|day|person|pp)\b|\bnightly\b|\bpp\b",
+    re.IGNORECASE,
+)
+FOREIGN_CURRENCY_RE = re.compile(
+    r"[€£¥₹₨]|\b(?:AED|EUR|GBP|JPY|INR|PKR|CAD|AUD|CHF|CNY|SAR|QAR|TRY|THB|MYR|SGD|IDR|NZD|MXN|BRL|ZAR|KRW|HKD|SEK|NOK|DKK)\b"
+    r"|\b(?:euros?|pounds?|yen|rupees?|dirhams?|riyals?|lira|baht|ringgit|pesos?|reais|francs?|yuan|kron(?:e|er|a|or|ur))\b",
+    re.IGNORECASE,
+)
+# Questions ("Can you tell me about hotels in Dubai...") may not be trip requests at all.
+QUESTION_RE = re.compile(
+    r"\?|^\s*(?:what|when|where|which|who|whom|why|how|is|are|was|were|do|does|did|can|could|would|should|will|tell me)\b",
+    re.IGNORECASE,
+)
+
+
+def _parse_amount(number: str, thousands: str | None) -> float:
+    value = float(number.replace(",", ""))
+    return value * 1000 if thousands else value
+
+
+def _parse_date(text: str, default_month: int | None, today: date) -> tuple[date, bool] | None:
+    """Parse one side of a date range; returns (date, year_was_given)."""
+    text = text.strip().lower().replace(",", " ")
+    try:
+        return date.fromisoformat(text), True
+    except ValueError:
+        pass
+    year_match = re.search(r"\b(\d{4})\b", text)
+    year = int(year_match.group(1)) if year_match else today.year
+    text = text[:year_match.start()] if year_match else text
+    day_match = re.search(r"\b(\d{1,2})(?:st|nd|rd|th)?\b", text)
+    months = [MONTHS[word] for word in re.findall(r"[a-z]+", text) if word in MONTHS]
+    month = months[0] if months else default_month
+    if not day_match or not month:
+        return None
+    try:
+        return date(year, month, int(day_match.group(1))), bool(year_match)
+    except ValueError:
+        return None
+
+
+def _parse_date_range(user_query: str, today: date) -> tuple[date, date] | None:
+    match = DATE_RANGE_RE.search(user_query)
+    if not match:
+        return None
+    start = _parse_date(match.group("start"), None, today)
+    if start is None:
+        return None
+    check_in, start_has_year = start
+    end = _parse_date(match.group("end"), check_in.month, today)
+    if end is None:
+        return None
+    check_out, end_has_year = end
+    if not start_has_year and check_in < today:
+        check_in = check_in.replace(year=check_in.year + 1)
+    if not end_has_year:
+        check_out = check_out.replace(year=check_in.year)
+        if check_out <= check_in:  # e.g. "Dec 28 to Jan 3"
+            check_out = check_out.replace(year=check_out.year + 1)
+    return check_in, check_out
+
+
+def destination_candidates(user_query: str) -> list[str]:
+    """Every place named in phrases like "in Dubai" / "to New York", in order, without repeats."""
+    candidates = []
+    for match in DESTINATION_RE.finditer(user_query):
+        words = match.group(1).rstrip(".").split()
+        while words and words[-1].lower().rstrip(".") in MONTHS:
+            words.pop()
+        if words and words[0].lower().rstrip(".") not in MONTHS:
+            place = " ".join(words)
+            if place not in candidates:
+                candidates.append(place)
+    return candidates
+
+
+def guess_destination(user_query: str) -> str | None:
+    """
+    The destination, if the query names exactly one place. "I live in London,
+    stay in Dubai" names two, and which one is meant is left to the LLM.
+    """
+    candidates = destination_candidates(user_query)
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _parse_guests(user_query: str) -> int | None:
+    matches = {m.group(1).lower() for m in GUESTS_RE.finditer(user_query)}
+    if len(matches) != 1:
+        return None
+    value = matches.pop()
+    return NUMBER_WORDS.get(value) or int(value)
+
+
+def _parse_budget(user_query: str) -> tuple[float, float] | None:
+    """The total budget in USD, or None if amounts are per night/person or in another currency."""
+    if PER_UNIT_RE.search(user_query) or FOREIGN_CURRENCY_RE.search(user_query):
+        return None
+    for pattern in BUDGET_RANGE_RES:
+        match = pattern.search(user_query)
+        if match:
+            low = _parse_amount(match.group(1), match.group(2))
+            high = _parse_amount(match.group(3), match.group(4))
+            if match.group(4) and not match.group(2) and low < 1000 <= high:
+                low *= 1000  # "2-3k"
+            return low, high
+    return None
+
+
+def _parse_standard(user_query: str) -> str | None:
+    found = [level for level, pattern in STANDARD_KEYWORDS.items() if re.search(rf"\b(?:{pattern})\b", user_query, re.IGNORECASE)]
+    return found[0] if len(found) == 1 else None
+
+
+def looks_like_trip_request(user_query: str, today: date | None = None) -> bool:
+    """A statement (not a question) giving travel dates or a party size."""
+    if QUESTION_RE.search(user_query):
+        return False
+    return _parse_date_range(user_query, today or date.today()) is not None or _parse_guests(user_query) is not None
+
+
+def fast_parse_query(user_query: str, today: date | None = None) -> AccommodationRequest | None:
+    """
+    Deterministically parse a trip-planning query. Returns a validated
+    AccommodationRequest only if every field was found unambiguously,
+    otherwise None so the caller falls back to the LLM.
+    """
+    if QUESTION_RE.search(user_query):
+        return None
+    today = today or date.today()
+    destination = guess_destination(user_query)
+    dates = _parse_date_range(user_query, today)
+    guests = _parse_guests(user_query)
+    budget = _parse_budget(user_query)
+    standard = _parse_standard(user_query)
+    if None in (destination, dates, guests, budget, standard):
+        return None
+    try:
+        return AccommodationRequest(
+            destination=destination,
+            check_in=dates[0].isoformat(),
+            check_out=dates[1].isoformat(),
+            guests=guests,
+            min_budget=budget[0],
+            max_budget=budget[1],
+            standard=standard,
+        )
+    except ValidationError:
+        return None
+
+
+class FastPathStats:
+    """Fast-path hit rate and the LLM latency it avoided."""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.parse_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def record_parse(self, hit: bool, seconds: float):
+        self.attempts += 1
+        self.hits += int(hit)
+        self.parse_seconds += seconds
+
+    def record_llm(self, seconds: float):
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+
+    def stats(self) -> dict:
+        avg_llm = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.attempts, 3) if self.attempts else 0.0,
+            "avg_llm_seconds": round(avg_llm, 3),
+            # Each hit skips one LLM understanding step of average length.
+            "estimated_seconds_saved": round(self.hits * avg_llm - self.parse_seconds, 3),
+        }
+
+
+fast_path_stats = FastPathStats()
@@ -1,47 +1,116 @@
 from agents import function_tool
 from dotenv import load_dotenv
-load_dotenv()   
+load_dotenv()
 import googlemaps
+import requests
+import asyncio
+import functools
 import os
-import time
-
-# ANSI Color Codes
-class Colors:
-    HEADER = '\033[95m'      # Purple
-    BLUE = '\033[94m'        # Blue
-    GREEN = '\033[92m'       # Green
-    YELLOW = '\033[93m'      # Yellow
-    RED = '\033[91m'         # Red
-    ENDC = '\033[0m'         # Reset color
-    BOLD = '\033[1m'         # Bold
-    UNDERLINE = '\033[4m'    # Underline
+from concurrent.futures import ThreadPoolExecutor
+from cache import TTLCache, make_durable_backend
+from governor import governor
+from observability import get_logger, timed
+from projection import project_places
+
+log = get_logger("research_destination")
 
 API_KEY = os.getenv("GOOGLE_API_KEY")
-gmaps = googlemaps.Client(key=API_KEY)
+PLACES_TIMEOUT = float(os.getenv("PLACES_TIMEOUT", "10"))
+PLACES_MAX_PAGES = int(os.getenv("PLACES_MAX_PAGES", "1"))      # up to 3 (60 results)
+PLACES_MAX_WORKERS = int(os.getenv("PLACES_MAX_WORKERS", "8"))
+NEXT_PAGE_TOKEN_DELAY = 2.0  # a next_page_token only becomes valid after a short delay
+
+# googlemaps is a blocking client. Calls run on a bounded thread pool sharing
+# one keep-alive session sized to match, so they never stall the event loop.
+_session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=PLACES_MAX_WORKERS))
+gmaps = googlemaps.Client(
+    key=API_KEY,
+    timeout=PLACES_TIMEOUT,
+    retry_timeout=PLACES_TIMEOUT,
+    requests_session=_session,
+    # Overridable so benchmarks can point Places calls at a local stub.
+    base_url=os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com"),
+)
+_places_executor = ThreadPoolExecutor(max_workers=PLACES_MAX_WORKERS, thread_name_prefix="places")
+
+# Attraction lists change over weeks, so cache them durably for a long time and,
+# past the TTL, keep serving the old list while one background call refreshes it.
+places_cache = TTLCache(
+    "places",
+    backend=make_durable_backend(
+        os.getenv("PLACES_CACHE_BACKEND", "sqlite"),
+        namespace="places",
+        max_entries=int(os.getenv("PLACES_CACHE_MAX_ENTRIES", "512")),
+        path=os.getenv("CACHE_DB_PATH", ".cache/trailmate.sqlite3"),
+    ),
+    ttl=float(os.getenv("PLACES_CACHE_TTL", str(7 * 24 * 3600))),
+    stale_ttl=float(os.getenv("PLACES_CACHE_STALE_TTL", str(7 * 24 * 3600))),
+    should_cache=bool,
+)
+
+
+def normalize_destination(destination: str) -> str:
+    return " ".join(destination.lower().replace(",", " ").split())
+
+
+async def _places_call(**kwargs) -> dict:
+    await governor.places.acquire()
+    loop = asyncio.get_running_loop()
+    call = functools.partial(gmaps.places, **kwargs)
+    with timed("places", "text_search"):
+        return await asyncio.wait_for(loop.run_in_executor(_places_executor, call), timeout=PLACES_TIMEOUT)
+
+
+async def _places_search(destination: str) -> list[dict]:
+    response = await _places_call(query=f"Top Tourist Attractions in {destination}")
+    results = response.get("results", [])
+
+    pages = 1
+    token = response.get("next_page_token")
+    while token and pages < PLACES_MAX_PAGES:
+        await asyncio.sleep(NEXT_PAGE_TOKEN_DELAY)
+        try:
+            response = await _places_call(page_token=token)
+        except (googlemaps.exceptions.ApiError, asyncio.TimeoutError) as e:
+            # Extra pages are a bonus; keep what we already have.
+            log.warning("Places next page failed for '%s': %r", destination, e)
+            break
+        results.extend(response.get("results", []))
+        token = response.get("next_page_token")
+        pages += 1
+    return results
+
+
+async def fetch_attractions(destination: str) -> list[dict]:
+    """Top attractions for `destination`, served from `places_cache` when possible."""
+    return await places_cache.get_or_load(
+        normalize_destination(destination),
+        lambda: _places_search(destination),
+    )
+
 
 @function_tool
-def research_destination(destination:str) -> list[dict]:
-    print(f"{Colors.YELLOW}[TOOL] research_destination called with destination='{destination}'{Colors.ENDC}")
-    start_time = time.time()
+async def research_destination(destination:str) -> list[dict]:
+    log.info("research_destination called", extra={"destination": destination})
     """
     Research top tourist attractions in the given destination using Google Places API.
-    
+
     Args:
         destination (str): City or location name.
     Returns:
-        list[dict]: List of places with name, address, rating, reviews, etc.
+        list[dict]: Top places with name, address, rating, reviews, price level and types.
     """
-    results = gmaps.places(query=f"Top Tourist Attractions in {destination}")
-    results = results.get("results", [])
-    duration = time.time() - start_time
-    print(f"{Colors.GREEN}[TOOL] research_destination completed – {len(results)} results in {duration:.2f}s{Colors.ENDC}")
+    with timed("tool", "research_destination"):
+        results = await fetch_attractions(destination)
+    log.info("research_destination completed with %d results", len(results))
     # for result in results:
     #     print("Name: ", result["name"])
     #     print("Address: ", result["formatted_address"])
     #     print("Rating: ", result["rating"])
     #     print("Total Reviews: ", result["user_ratings_total"])
 
-    return results
+    return project_places(results)
 
 
 
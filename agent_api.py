@@ -1,31 +1,122 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from openai.types.responses import ResponseTextDeltaEvent
 
 from pydantic import BaseModel
 from agents import Agent, Runner, set_tracing_disabled
-from agents.extensions.models.litellm_model import LitellmModel
-from Agent_Input import extract_query_data, AccommodationRequest
-from airbnb_scraper import scrape_airbnb
-from Research_dest import research_destination
+from Agent_Input import extract_query_data, classify_and_extract, fast_parse_query, fast_path_stats, AccommodationRequest
+from airbnb_scraper import listing_cache, listing_index_stats, parse_nightly_price, search_listings
+from answer_cache import ANSWER_CACHE_ENABLED, general_info_cache
+from browser_pool import browser_pool
+from Research_dest import fetch_attractions, places_cache
+from trip_agents import (
+    TripParams,
+    accommodation_agent,
+    accommodation_analyst,
+    budget_narrator,
+    budget_optimizer,
+    close_shared_http_client,
+    experience_analyst,
+    experience_planner,
+    general_info_agent,
+)
 from dotenv import load_dotenv
-from datetime import datetime
 import os
+import json
+import math
+import time
 import asyncio
-
-from groq import Groq  # needed for classification
-from colorama import Fore, Style, init as colorama_init
-
-colorama_init(autoreset=True)
+from dataclasses import asdict
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from budget_engine import optimize_budget
+from deadline import NO_DEADLINE, Deadline, StageTimeout
+from llm_client import chat_completion, close_groq_client
+from projection import compact_json, project_listings, project_places, truncate_text
+from governor import Overloaded, governor
+from jobs import JobQueue, QueueFullError, make_job_store
+from plan_store import PlanSession, fingerprint, make_plan_store
+from speculation import Speculation, speculation_stats
+from observability import (
+    get_logger,
+    http_request_seconds,
+    registry,
+    server_timing_header,
+    setup_logging,
+    shutdown_logging,
+    start_request_timings,
+    timed,
+)
 
 load_dotenv()
 set_tracing_disabled(disabled=True)
+setup_logging()
+log = get_logger("api")
+
+# "combined" classifies and extracts in one LLM call, falling back to
+# "two_step" (classify_intent then extract_query_data) if its output is invalid.
+QUERY_EXTRACTION_MODE = os.getenv("QUERY_EXTRACTION_MODE", "combined")
+# Try the rule-based parser first and skip the LLM when it fills every field.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+# Idle SSE connections get a comment line this often so proxies keep them open.
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# "direct" calls research_destination / scrape_airbnb ourselves, concurrently,
+# and gives each agent the results in a single LLM call; "agent" lets the
+# agents call the tools.
+ORCHESTRATION_MODE = os.getenv("ORCHESTRATION_MODE", "direct")
+# Compute the budget allocation in Python and only have the LLM narrate it;
+# with "0" (or when no listing fits) the Budget Optimizer Agent does it all.
+BUDGET_ENGINE_ENABLED = os.getenv("BUDGET_ENGINE_ENABLED", "1") == "1"
+# Background /plan-trip/jobs: how many pipelines run at once, how many may
+# wait, and where job records live ("memory" or "sqlite").
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "memory")
+JOB_STORE_MAX_JOBS = int(os.getenv("JOB_STORE_MAX_JOBS", "1000"))
+# Add a Server-Timing header listing the steps timed during each request.
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") == "1"
+# Plans that follow-up queries (sent with their `plan_id`) can revise.
+PLAN_STORE_BACKEND = os.getenv("PLAN_STORE_BACKEND", "memory")
+PLAN_STORE_MAX_PLANS = int(os.getenv("PLAN_STORE_MAX_PLANS", "500"))
+PLAN_STORE_TTL = float(os.getenv("PLAN_STORE_TTL", "21600"))
+# Time allowed for a whole /plan-trip request (0 disables). Each stage gets a
+# share of it: a stage that runs out is cancelled and the plan is finished
+# without it, with the stage listed in "missing_stages".
+PLAN_DEADLINE_SECONDS = float(os.getenv("PLAN_DEADLINE_SECONDS", "180"))
+
+# Shares of PLAN_DEADLINE_SECONDS. Activities and accommodation run side by
+# side; the budget stage gets whatever is left. In "direct" mode the tool
+# lookup may use TOOL_SHARE of its stage, leaving the rest for the agent.
+UNDERSTAND_SHARE = 0.2
+ACTIVITIES_SHARE = 0.55
+ACCOMMODATION_SHARE = 0.55
+BUDGET_SHARE = 1.0
+TOOL_SHARE = 0.6
+# The budget engine's lookups are normally cache hits by then; one that isn't
+# is a lookup the stages already gave up on, so it falls back quickly.
+BUDGET_LOOKUP_SHARE = 0.05
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pre-warm Chromium so the first scrape doesn't pay browser startup.
+    # A failure here must not take the API down; the pool retries lazily on first use.
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        log.error("Browser pool warm-up failed, will retry on demand: %s", e)
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    await browser_pool.stop()
+    await close_groq_client()
+    await close_shared_http_client()
+    shutdown_logging()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-MODEL = os.getenv("MODEL")
-
-client = Groq(api_key=GROQ_API_KEY)
 
-app = FastAPI(title="Travel Planner API")
+app = FastAPI(title="Travel Planner API", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -44,164 +135,673 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Observe request latency and, if enabled, attach the request's Server-Timing header."""
+    token = start_request_timings()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        route = request.scope.get("route")
+        http_request_seconds.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+        header = server_timing_header(token)
+    if SERVER_TIMING_ENABLED and header:
+        # For streamed responses this covers only what ran before the first byte.
+        response.headers["Server-Timing"] = header
+    return response
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    log.warning("Rejected %s: %s", request.url.path, exc, extra={"resource": exc.resource})
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the stage histograms and current queue/cache gauges."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "listing_cache": listing_cache.stats(),
+        "listing_index": listing_index_stats.stats(),
+        "places_cache": places_cache.stats(),
+        "general_info_cache": general_info_cache.stats(),
+        "fast_path": fast_path_stats.stats(),
+        "speculation": speculation_stats.stats(),
+        "jobs": job_queue.stats(),
+        "plans": plan_store.stats(),
+        "governor": governor.stats(),
+    }
+
 class QueryRequest(BaseModel):
     query: str
+    # Set to revise an earlier plan: only the stages whose inputs changed rerun.
+    plan_id: str | None = None
 
 
 async def classify_intent(user_query: str) -> str:
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a classifier. Given a user query, reply with one word: "
-                    "'trip_planning' if the user is asking to plan/book a trip with details like destination, dates, guests, budget, etc. "
-                    "Or 'general_info' if the user is just asking for information or advice without booking."
-                )
-            },
-            {"role": "user", "content": user_query}
-        ],
-        temperature=0,
-        max_completion_tokens=10,
-    )
+    with timed("llm", "classify"):
+        completion = await chat_completion(
+            model="meta-llama/llama-4-scout-17b-16e-instruct",
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a classifier. Given a user query, reply with one word: "
+                        "'trip_planning' if the user is asking to plan/book a trip with details like destination, dates, guests, budget, etc. "
+                        "Or 'general_info' if the user is just asking for information or advice without booking."
+                    )
+                },
+                {"role": "user", "content": user_query}
+            ],
+            temperature=0,
+            max_completion_tokens=10,
+        )
     intent = completion.choices[0].message.content.strip()
-    print(f"{Fore.YELLOW}[INTENT CLASSIFIED]: {intent}{Style.RESET_ALL}")
+    log.info("Intent classified: %s", intent)
     return intent
 
 
-general_info_agent = Agent(
-    name="General Info Agent",
-    instructions=(
-        "Answer the user's question about travel in a helpful and concise way. "
-        "Do not assume they want to book anything. If relevant, mention attractions, best times to visit, culture, or travel tips."
-    ),
-    model=LitellmModel(model=MODEL, api_key=GROQ_API_KEY),
-)
+async def understand_query(user_query: str, previous: AccommodationRequest | None = None) -> tuple[str, AccommodationRequest | None]:
+    """
+    Return the query's intent and, for trip planning, its validated fields.
+    While the LLM works, the guessed destination's tool data is prefetched
+    (a fast-path hit needs no LLM, so there is nothing to overlap).
+
+    With `previous`, the query is a follow-up that may only mention what
+    changes ("make it 4 nights"); the LLM fills in the rest from `previous`.
+    """
+    if FAST_PATH_ENABLED:
+        started = time.perf_counter()
+        validated = fast_parse_query(user_query)
+        fast_path_stats.record_parse(validated is not None, time.perf_counter() - started)
+        if validated is not None:
+            log.info("Intent classified: trip_planning (fast path)")
+            return "trip_planning", validated
+
+    speculation = Speculation(user_query)
+    try:
+        intent, validated = await _understand_query(user_query, previous)
+    except BaseException:
+        speculation.discard()
+        raise
+    speculation.resolve(intent, validated)
+    return intent, validated
+
+
+async def _understand_query(user_query: str, previous: AccommodationRequest | None) -> tuple[str, AccommodationRequest | None]:
+    if previous is not None:
+        user_query = (
+            f"Current trip request: {previous.model_dump_json()}\n"
+            f"Requested change: {user_query}\n"
+            f"Apply the change and return the complete updated trip request, "
+            f"keeping every field the change doesn't mention."
+        )
+    started = time.perf_counter()
+    intent, validated = await _understand_query_with_llm(user_query)
+    fast_path_stats.record_llm(time.perf_counter() - started)
+    return intent, validated
 
 
-@app.post("/plan-trip")
-async def plan_trip(request: QueryRequest):
-    user_query = request.query
-    print(f"{Fore.CYAN}[REQUEST RECEIVED]: {user_query}{Style.RESET_ALL}")
+async def _understand_query_with_llm(user_query: str) -> tuple[str, AccommodationRequest | None]:
+    if QUERY_EXTRACTION_MODE == "combined":
+        try:
+            understanding = await classify_and_extract(user_query)
+            log.info("Intent classified: %s (combined)", understanding.intent)
+            return understanding.intent, understanding.fields
+        except ValueError as e:
+            log.warning("Combined extraction falling back to two-step: %s", e)
 
     intent = await classify_intent(user_query)
-
     if intent == "general_info":
-        print(f"{Fore.CYAN}[GENERAL INFO AGENT]: Running…{Style.RESET_ALL}")
-        response = await Runner.run(general_info_agent, user_query)
-        print(f"{Fore.GREEN}[GENERAL INFO RESPONSE]:\n{response.final_output}{Style.RESET_ALL}")
-        return {
-            "intent": intent,
-            "response": response.final_output
-        }
-
-    print(f"{Fore.CYAN}[TRIP PLANNING]: Extracting and validating data…{Style.RESET_ALL}")
+        return intent, None
+
+    log.info("Extracting and validating trip data")
     try:
-        extracted_data = extract_query_data(user_query)
+        extracted_data = await extract_query_data(user_query)
         validated = AccommodationRequest(**extracted_data)
     except Exception as e:
-        print(f"{Fore.RED}[ERROR]: {e}{Style.RESET_ALL}")
+        log.warning("Trip data extraction failed: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
+    return intent, validated
 
-    destination = extracted_data["destination"]
-    check_in_str = extracted_data['check_in']
-    check_out_str = extracted_data['check_out']
-    guests = extracted_data["guests"]
-    preferences = extracted_data["standard"]
-    min_total_budget = extracted_data["min_budget"]
-    max_total_budget = extracted_data["max_budget"]
-
-    check_in_date = datetime.fromisoformat(check_in_str)
-    check_out_date = datetime.fromisoformat(check_out_str)
-    num_nights = (check_out_date - check_in_date).days
-    if num_nights <= 0:
-        raise HTTPException(status_code=400, detail="Check-out date must be after check-in date.")
-
-    duration = f"{num_nights} nights ({check_in_str} to {check_out_str})"
-    accommodation_budget_ratio = 0.6
-    max_accom_budget = max_total_budget * accommodation_budget_ratio
-    max_nightly_price = int(max_accom_budget / num_nights)
-
-    experience_planner = Agent(
-        name="Experience Planner Agent",
-        instructions=(
-            f"Use the `research_destination` tool to research and suggest engaging, "
-            f"local, and culturally relevant activities and attractions in {destination}. "
-            f"The tool only requires the destination name as input. "
-            f"After getting the results, analyze and recommend activities suitable for {guests} guest(s) "
-            f"for a {duration} trip. The total budget for the trip (accommodations and activities) is ${min_total_budget}-${max_total_budget}. "
-            f"The user has a preference for '{preferences}' level experiences. "
-            f"Include a variety of options for adventure, relaxation, and sightseeing with estimated costs per person."
-        ),
-        tools=[research_destination],
-        model=LitellmModel(model=MODEL, api_key=GROQ_API_KEY),
-    )
 
-    accommodation_agent = Agent(
-        name="Accommodation Agent",
-        instructions=(
-            f"Use the `scrape_airbnb` tool to find available accommodation options. "
-            f"The tool requires these parameters: location='{destination}', guests={guests}, "
-            f"max_price={max_nightly_price}, check_in='{check_in_str}', check_out='{check_out_str}'. "
-            f"Call the tool with these exact parameters. "
-            f"Analyze and rank results based on price, guest ratings, proximity to attractions, and overall value. "
-            f"Return up to 5 of the best options with clear reasoning for {preferences} preferences."
-        ),
-        tools=[scrape_airbnb],
-        model=LitellmModel(model=MODEL, api_key=GROQ_API_KEY),
+def trip_params(validated: AccommodationRequest) -> TripParams:
+    try:
+        return TripParams.from_request(validated)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def run_agent(agent: Agent, input: str, context=None) -> str:
+    """`Runner.run`, timed under the agent's name."""
+    with timed("agent", agent.name):
+        result = await Runner.run(agent, input, context=context)
+    return result.final_output
+
+
+async def stream_agent_output(agent: Agent, input: str, stage: str, stream: bool, context=None):
+    """
+    Run `agent`, yielding `(f"{stage}_delta", text)` for each streamed token
+    when `stream` is set, then `(stage, final_output)`.
+    """
+    if not stream:
+        yield stage, await run_agent(agent, input, context=context)
+        return
+
+    with timed("agent", agent.name):
+        streamed = Runner.run_streamed(agent, input, context=context)
+        async for event in streamed.stream_events():
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                yield f"{stage}_delta", event.data.delta
+    yield stage, streamed.final_output
+
+
+async def answer_general_info(user_query: str, stream: bool):
+    """
+    `stream_agent_output` for the General Info Agent, answered from
+    `general_info_cache` when the same or a near-identical question was seen.
+    """
+    if ANSWER_CACHE_ENABLED:
+        cached = general_info_cache.get(user_query)
+        if cached is not None:
+            yield "response", cached
+            return
+
+    answer = None
+    async for stage, output in stream_agent_output(general_info_agent, user_query, "response", stream=stream):
+        if stage == "response":
+            answer = output
+        yield stage, output
+    if ANSWER_CACHE_ENABLED and answer:
+        general_info_cache.set(user_query, answer)
+
+
+async def run_activities_stage(params: TripParams, session: PlanSession | None = None, deadline: Deadline = NO_DEADLINE) -> str:
+    # Budget changes don't change which attractions are worth seeing.
+    stage_fingerprint = fingerprint(
+        "activities", ORCHESTRATION_MODE, params.destination, params.check_in, params.check_out,
+        params.guests, params.preferences,
     )
+    reused = session.reusable("activities", stage_fingerprint) if session else None
+    if reused is not None:
+        return reused
+    output = await _run_activities_stage(params, deadline)
+    if session is not None:
+        session.record("activities", stage_fingerprint, output)
+    return output
+
+
+async def _run_activities_stage(params: TripParams, deadline: Deadline) -> str:
+    if ORCHESTRATION_MODE == "agent":
+        return await run_agent(experience_planner, params.destination, context=params)
+
+    try:
+        async with deadline.stage("research_destination", ACTIVITIES_SHARE * TOOL_SHARE):
+            with timed("tool", "research_destination"):
+                attractions = await fetch_attractions(params.destination)
+        research = compact_json(project_places(attractions))
+    except Exception as e:
+        log.error("Attraction lookup failed: %s", e, extra={"destination": params.destination})
+        research = f"Attraction lookup failed ({e}). Rely on general knowledge of {params.destination}."
+    return await run_agent(experience_analyst, f"ATTRACTIONS RESEARCH:\n{research}", context=params)
+
+
+async def find_listings(params: TripParams, session: PlanSession | None = None) -> list[dict]:
+    """
+    `search_listings` for the trip. A revision of a plan whose last search had
+    the same destination, guests and dates and at least as high a price cap
+    re-filters those listings instead of searching again.
+    """
+    search_key = fingerprint(params.destination, params.guests, params.check_in, params.check_out)
+    previous = session.listings if session else None
+    if previous is not None and previous["key"] == search_key and previous["max_price"] >= params.max_nightly_price:
+        listings = []
+        for listing in previous["listings"]:
+            nightly = parse_nightly_price(listing["price"], params.num_nights)
+            if nightly is None or nightly <= params.max_nightly_price:
+                listings.append(listing)
+        return listings
+
+    with timed("tool", "scrape_airbnb"):
+        listings = await search_listings(
+            params.destination, params.guests, params.max_nightly_price, params.check_in, params.check_out
+        )
+    if session is not None:
+        session.listings = {"key": search_key, "max_price": params.max_nightly_price, "listings": listings}
+    return listings
+
+
+async def run_accommodation_stage(params: TripParams, session: PlanSession | None = None, deadline: Deadline = NO_DEADLINE) -> str:
+    if ORCHESTRATION_MODE == "agent":
+        # The agent searches by itself, so any input change means a new run.
+        stage_fingerprint = fingerprint("accommodation", ORCHESTRATION_MODE, asdict(params))
+        reused = session.reusable("accommodation", stage_fingerprint) if session else None
+        if reused is not None:
+            return reused
+        output = await run_agent(accommodation_agent, "Find accommodations for the specified parameters in the instructions", context=params)
+    else:
+        try:
+            async with deadline.stage("scrape_airbnb", ACCOMMODATION_SHARE * TOOL_SHARE):
+                listings = await find_listings(params, session)
+            options = compact_json(project_listings(listings))
+        except Exception as e:
+            log.error("Listing search failed: %s", e, extra={"destination": params.destination})
+            options = f"Listing search failed ({e}). No listings are available."
+        # Rerun the analysis only if the candidate listings changed, not just the cap.
+        stage_fingerprint = fingerprint(
+            "accommodation", ORCHESTRATION_MODE, params.destination, params.check_in, params.check_out,
+            params.guests, params.preferences, options,
+        )
+        reused = session.reusable("accommodation", stage_fingerprint) if session else None
+        if reused is not None:
+            return reused
+        output = await run_agent(accommodation_analyst, f"ACCOMMODATION LISTINGS:\n{options}", context=params)
+
+    if session is not None:
+        session.record("accommodation", stage_fingerprint, output)
+    return output
+
+
+async def compute_budget_plan(params: TripParams, session: PlanSession | None = None, deadline: Deadline = NO_DEADLINE):
+    """
+    Choose the stay and activities with `budget_engine`. Both lookups were
+    just made by the stages, so they are served from the caches (or the session).
+    Returns None when there is nothing to optimise over.
+    """
+    try:
+        async with deadline.stage("budget_lookups", BUDGET_LOOKUP_SHARE):
+            attractions, listings = await asyncio.gather(
+                fetch_attractions(params.destination),
+                find_listings(params, session),
+            )
+    except Exception as e:
+        log.warning("Budget engine data lookup failed, falling back to the LLM: %s", e)
+        return None
+
+    # The knapsack is CPU-bound; keep it off the event loop.
+    with timed("engine", "budget"):
+        return await asyncio.to_thread(
+            optimize_budget,
+            project_listings(listings, token_budget=math.inf),
+            project_places(attractions, token_budget=math.inf),
+            guests=params.guests,
+            nights=params.num_nights,
+            check_in=params.check_in,
+            min_budget=params.min_total_budget,
+            max_budget=params.max_total_budget,
+            preference=params.preferences,
+        )
+
 
-    budget_optimizer = Agent(
-        name="Budget Optimizer Agent",
-        instructions=(
-            f"Optimize the trip plan for {guests} guest(s) in {destination} for {duration}. "
-            f"The total budget for the trip is between ${min_total_budget} and ${max_total_budget}. "
-            f"The user's preference is '{preferences}'. "
-            f"Create a day-by-day itinerary with specific costs for activities and accommodation. "
-            f"Provide a final summary of the total estimated cost and confirm it fits within the budget. "
-            f"IMPORTANT: Format your response using proper Markdown syntax with headers (##), bold text (**text**), "
-            f"bullet points (-), and tables. Create a clear cost breakdown table with columns for Day, Activity, and Cost."
-        ),
-        model=LitellmModel(model=MODEL, api_key=GROQ_API_KEY),
+async def supervisor(
+    params: TripParams,
+    stream: bool = False,
+    session: PlanSession | None = None,
+    deadline: Deadline = NO_DEADLINE,
+):
+    """
+    Run the planning agents, yielding `(stage, output)` as each one finishes:
+    "activities" and "accommodation" in completion order, then "budget_breakdown"
+    (the engine's allocation, when it found one), "optimized_plan" (preceded
+    by "optimized_plan_delta" tokens when `stream` is set) and "missing_stages".
+
+    Each stage runs within its share of `deadline`. A stage that fails or runs
+    out of time yields None and the plan is finished from the others;
+    "missing_stages" lists `{"stage", "reason"}` for each one left out.
+
+    With a `session`, stages whose inputs match its previous revision return
+    their stored output instead of running, and new outputs are recorded.
+    """
+    log.info("Running experience planner and accommodation stages", extra={"destination": params.destination})
+
+    async def run_stage(name: str, run, share: float) -> str:
+        async with deadline.stage(name, share):
+            return await run(params, session, deadline)
+
+    planner_task = asyncio.create_task(run_stage("activities", run_activities_stage, ACTIVITIES_SHARE))
+    accom_task = asyncio.create_task(run_stage("accommodation", run_accommodation_stage, ACCOMMODATION_SHARE))
+
+    stages = {planner_task: "activities", accom_task: "accommodation"}
+    outputs = {}
+    missing = []
+    try:
+        pending = set(stages)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = stages[task]
+                try:
+                    outputs[stage] = task.result()
+                except Exception as e:
+                    log.error("Stage %s failed, planning without it: %s", stage, e)
+                    outputs[stage] = None
+                    missing.append({"stage": stage, "reason": str(e) or type(e).__name__})
+                else:
+                    log.info("Stage %s finished", stage, extra={"chars": len(outputs[stage])})
+                    log.debug("Stage %s output:\n%s", stage, outputs[stage])
+                yield stage, outputs[stage]
+    finally:
+        # Don't leave agents running if the caller went away.
+        for task in stages:
+            task.cancel()
+
+    stage_fingerprint = fingerprint(
+        "budget", BUDGET_ENGINE_ENABLED, asdict(params), outputs["activities"], outputs["accommodation"]
+    )
+    reused = session.reusable("budget", stage_fingerprint) if session else None
+    if reused is not None:
+        if reused["budget_breakdown"] is not None:
+            yield "budget_breakdown", reused["budget_breakdown"]
+        yield "optimized_plan", reused["optimized_plan"]
+        yield "missing_stages", missing
+        return
+
+    budget = {"budget_breakdown": None, "optimized_plan": None}
+    try:
+        async for stage, output in deadline.iterate("budget", optimize_plan(params, outputs, stream, session, deadline), BUDGET_SHARE):
+            if stage in budget:
+                budget[stage] = output
+            yield stage, output
+    except Exception as e:
+        log.error("Budget stage failed: %s", e)
+        missing.append({"stage": "optimized_plan", "reason": str(e) or type(e).__name__})
+        yield "optimized_plan", None
+    # A plan built around a missing stage is redone on the next revision.
+    if session is not None and not missing:
+        session.record("budget", stage_fingerprint, budget)
+    yield "missing_stages", missing
+
+
+async def optimize_plan(params: TripParams, outputs: dict, stream: bool, session: PlanSession | None, deadline: Deadline):
+    """
+    The budget stage of `supervisor`: engine plus narrator, or the Budget
+    Optimizer Agent. Stages missing from `outputs` (None) are described as
+    unavailable; the engine is skipped then, as its lookups are what failed.
+    """
+    complete = all(output is not None for output in outputs.values())
+    plan = await compute_budget_plan(params, session, deadline) if BUDGET_ENGINE_ENABLED and complete else None
+    if plan is not None:
+        breakdown = plan.to_dict()
+        yield "budget_breakdown", breakdown
+        log.info("Narrating computed plan", extra={"total": plan.total, "max_budget": plan.max_budget})
+        async for stage, output in stream_agent_output(
+            budget_narrator, f"COMPUTED PLAN:\n{compact_json(breakdown)}", "optimized_plan", stream, context=params
+        ):
+            yield stage, output
+        return
+
+    def section(stage: str) -> str:
+        output = outputs[stage]
+        if output is None:
+            return f"Not available: the {stage} stage did not finish. Plan without it and say so."
+        return truncate_text(output)
+
+    combined_input = (
+        f"Trip Planning Data for {params.destination} ({params.duration}):\n"
+        f"Guests: {params.guests} | Total Trip Budget: ${params.min_total_budget}-${params.max_total_budget} | Standard: {params.preferences}\n\n"
+        f"ACTIVITIES RESEARCH:\n{section('activities')}\n\n"
+        f"ACCOMMODATION OPTIONS:\n{section('accommodation')}\n\n"
+        f"Please create an optimized itinerary that combines the best activities and accommodation "
+        f"within the specified budget. Include a day-by-day cost breakdown and a final total."
     )
 
-    async def supervisor():
-        print(f"{Fore.CYAN}[EXPERIENCE PLANNER]: Running…{Style.RESET_ALL}")
-        planner_task = Runner.run(experience_planner, destination)
+    log.info("Running budget optimizer agent")
+    async for stage, output in stream_agent_output(budget_optimizer, combined_input, "optimized_plan", stream, context=params):
+        yield stage, output
 
-        print(f"{Fore.CYAN}[ACCOMMODATION AGENT]: Running…{Style.RESET_ALL}")
-        accom_task = Runner.run(accommodation_agent, "Find accommodations for the specified parameters in the instructions")
 
-        planner_result, accommodation_result = await asyncio.gather(planner_task, accom_task)
+async def open_plan(user_query: str, plan_id: str | None, deadline: Deadline = NO_DEADLINE):
+    """
+    Understand the query and, for trip planning, load the session it revises
+    (or start one). Returns `(intent, validated, params, session, plan_info)`.
+    Understanding that runs out of its share of `deadline` is a 504.
+    """
+    session = None
+    if plan_id is not None:
+        session = await plan_store.get(plan_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Plan not found or expired")
 
-        print(f"{Fore.GREEN}[EXPERIENCE PLANNER RESULT]:\n{planner_result.final_output}{Style.RESET_ALL}")
-        print(f"{Fore.GREEN}[ACCOMMODATION RESULT]:\n{accommodation_result.final_output}{Style.RESET_ALL}")
+    previous = AccommodationRequest(**session.request) if session else None
+    try:
+        async with deadline.stage("understand", UNDERSTAND_SHARE):
+            intent, validated = await understand_query(user_query, previous)
+    except StageTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    if intent == "general_info":
+        return intent, None, None, None, None
+
+    params = trip_params(validated)
+    if session is None:
+        session = plan_store.create(validated.model_dump())
+        changed = []
+    else:
+        changed = session.revise(validated.model_dump())
+        log.info("Revising plan", extra={"plan_id": session.id, "revision": session.revision, "changed": changed})
+    plan_info = {"plan_id": session.id, "revision": session.revision, "changed_fields": changed}
+    return intent, validated, params, session, plan_info
+
+
+async def run_plan(params: TripParams, session: PlanSession, stream: bool = False, deadline: Deadline = NO_DEADLINE):
+    """`supervisor` over the session, then "reused_stages"; the session is saved even if a stage fails."""
+    try:
+        async for stage, output in supervisor(params, stream=stream, session=session, deadline=deadline):
+            yield stage, output
+        yield "reused_stages", session.reused_stages
+    finally:
+        await plan_store.put(session)
+
+
+async def plan_trip_stages(user_query: str, plan_id: str | None = None):
+    """
+    The whole /plan-trip pipeline as `(key, value)` pairs of its response:
+    "intent", then "response" for general-info queries, or "plan",
+    "extracted_data", the supervisor's stages and "reused_stages", all within
+    PLAN_DEADLINE_SECONDS.
+    """
+    deadline = Deadline(PLAN_DEADLINE_SECONDS)
+    intent, validated, params, session, plan_info = await open_plan(user_query, plan_id, deadline)
+    yield "intent", intent
+
+    if intent == "general_info":
+        try:
+            async for stage, output in deadline.iterate("general_info", answer_general_info(user_query, stream=False), 1.0):
+                yield stage, output
+        except StageTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        return
+
+    yield "plan", plan_info
+    yield "extracted_data", validated.model_dump()
+    async for stage, output in run_plan(params, session, deadline=deadline):
+        yield stage, output
+
+
+plan_store = make_plan_store(PLAN_STORE_BACKEND, PLAN_STORE_MAX_PLANS, PLAN_STORE_TTL)
+
+job_queue = JobQueue(
+    make_job_store(JOB_STORE_BACKEND, JOB_STORE_MAX_JOBS),
+    plan_trip_stages,
+    concurrency=JOB_CONCURRENCY,
+    max_queued=JOB_MAX_QUEUED,
+)
 
-        combined_input = (
-            f"Trip Planning Data for {destination} ({duration}):\n"
-            f"Guests: {guests} | Total Trip Budget: ${min_total_budget}-${max_total_budget} | Standard: {preferences}\n\n"
-            f"ACTIVITIES RESEARCH:\n{planner_result.final_output}\n\n"
-            f"ACCOMMODATION OPTIONS:\n{accommodation_result.final_output}\n\n"
-            f"Please create an optimized itinerary that combines the best activities and accommodation "
-            f"within the specified budget. Include a day-by-day cost breakdown and a final total."
-        )
 
-        print(f"{Fore.CYAN}[BUDGET OPTIMIZER]: Running…{Style.RESET_ALL}")
-        budget_result = await Runner.run(budget_optimizer, combined_input)
+def _collect_gauges():
+    """Current queue, limiter and cache state for /metrics."""
+    governed = governor.stats()
+    caches = {
+        "listings": listing_cache.stats(),
+        "places": places_cache.stats(),
+        "general_info": general_info_cache.stats(),
+    }
+    jobs = job_queue.stats()
+    return [
+        ("trailmate_governor_waiting", "Callers queued for a governed resource.",
+         {(("resource", name),): s["waiting"] for name, s in governed.items()}),
+        ("trailmate_governor_in_use", "Slots held on a governed resource.",
+         {(("resource", name),): s["in_use"] for name, s in governed.items() if "in_use" in s}),
+        ("trailmate_governor_rejected", "Callers rejected with 503, since start.",
+         {(("resource", name),): s["rejected"] + s["timed_out"] for name, s in governed.items()}),
+        ("trailmate_governor_avg_wait_seconds", "Average wait for a governed resource, since start.",
+         {(("resource", name),): s["avg_wait_seconds"] for name, s in governed.items()}),
+        ("trailmate_cache_entries", "Entries held by a cache.",
+         {(("cache", name),): s["entries"] for name, s in caches.items()}),
+        ("trailmate_cache_hit_rate", "Cache hit rate since start.",
+         {(("cache", name),): s["hit_rate"] for name, s in caches.items()}),
+        ("trailmate_jobs", "Background jobs by state.",
+         {(("state", "running"),): jobs["running"], (("state", "queued"),): jobs["queued"]}),
+    ]
+
+
+registry.register_collector(_collect_gauges)
 
-        print(f"{Fore.GREEN}[BUDGET OPTIMIZER RESULT]:\n{budget_result.final_output}{Style.RESET_ALL}")
 
-        return {
-            "intent": intent,
-            "extracted_data": validated.model_dump(),
-            "activities": planner_result.final_output,
-            "accommodation": accommodation_result.final_output,
-            "optimized_plan": budget_result.final_output,
-        }
+@app.post("/plan-trip")
+async def plan_trip(request: QueryRequest):
+    user_query = request.query
+    log.info("Request received", extra={"query": user_query})
 
-    result = await supervisor()
+    result = {}
+    async with governor.requests.slot():
+        async for key, value in plan_trip_stages(user_query, request.plan_id):
+            result[key] = value
     return result
+
+
+@app.post("/plan-trip/jobs", status_code=202)
+async def create_plan_trip_job(request: QueryRequest):
+    """
+    Queue a /plan-trip run and return its id at once. Poll
+    GET /plan-trip/jobs/{job_id} for progress: `stages` fills in as each stage
+    finishes and `result` holds what /plan-trip would have returned so far.
+    """
+    log.info("Job request received", extra={"query": request.query})
+    try:
+        job = await job_queue.submit(request.query, request.plan_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Job queue is full: {e}", headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/plan-trip/jobs/{job_id}")
+async def get_plan_trip_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.delete("/plan-trip/jobs/{job_id}")
+async def cancel_plan_trip_job(job_id: str):
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job.id, "status": job.status}
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _with_heartbeat(events, interval: float):
+    """
+    Pass `events` through, inserting an SSE comment whenever nothing was sent
+    for `interval` seconds so proxies don't close the idle connection.
+    """
+    iterator = events.__aiter__()
+    next_event = asyncio.ensure_future(anext(iterator))
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=interval)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                item = next_event.result()
+            except StopAsyncIteration:
+                return
+            yield item
+            next_event = asyncio.ensure_future(anext(iterator))
+    finally:
+        if not next_event.done():
+            next_event.cancel()
+            await asyncio.gather(next_event, return_exceptions=True)
+        await iterator.aclose()
+
+
+@app.post("/plan-trip/stream")
+async def plan_trip_stream(request: QueryRequest):
+    """
+    Server-Sent Events version of /plan-trip. Extraction happens before the
+    response starts (so bad input still gets a 400); then events are sent in
+    order: `extracted_data` (with the `plan` id to send follow-ups with),
+    `activities` / `accommodation` as each agent finishes, `budget_breakdown`,
+    `optimized_plan_delta` tokens, `optimized_plan`, `missing_stages`,
+    `reused_stages` and `done`. A stage that fails or runs out of its share of
+    PLAN_DEADLINE_SECONDS is sent as null and listed in `missing_stages`.
+    General-info queries stream `response_delta` tokens and `response` (only
+    `response` when the answer is cached).
+    """
+    user_query = request.query
+    log.info("Stream request received", extra={"query": user_query})
+
+    # The admission slot is held until the stream ends, not just until the response starts.
+    admission = AsyncExitStack()
+    await admission.enter_async_context(governor.requests.slot())
+    deadline = Deadline(PLAN_DEADLINE_SECONDS)
+    try:
+        intent, validated, params, session, plan_info = await open_plan(user_query, request.plan_id, deadline)
+    except BaseException:
+        await admission.aclose()
+        raise
+
+    async def events():
+        try:
+            if params is None:
+                yield _sse("intent", {"intent": intent})
+                async for stage, output in deadline.iterate("general_info", answer_general_info(user_query, stream=True), 1.0):
+                    yield _sse(stage, output)
+            else:
+                yield _sse("extracted_data", {"intent": intent, "plan": plan_info, "extracted_data": validated.model_dump()})
+                async for stage, output in run_plan(params, session, stream=True, deadline=deadline):
+                    yield _sse(stage, output)
+            yield _sse("done", {})
+        except Overloaded as e:
+            log.error("Stream failed: %s", e)
+            yield _sse("error", {"detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            log.error("Stream failed: %s", e)
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            await admission.aclose()
+
+    return StreamingResponse(
+        _with_heartbeat(events(), SSE_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Releases the slot even if the stream was never started.
+        background=BackgroundTask(admission.aclose),
+    )
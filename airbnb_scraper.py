@@ -1,21 +1,218 @@
 import asyncio
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import base64
+import math
+from collections import OrderedDict
+from contextlib import aclosing, asynccontextmanager
+from urllib.parse import quote, urlsplit
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 import json
 import re
 from datetime import datetime
 from agents import function_tool
+from browser_pool import browser_pool
+from cache import TTLCache, make_backend
+from governor import governor
+from observability import (
+    get_logger,
+    scrape_blocked_requests,
+    scrape_page_bytes,
+    scrape_page_heap_bytes,
+    scrape_page_ready_seconds,
+    scrape_pages,
+    scrape_pages_per_second,
+    timed,
+)
+from projection import listing_key, parse_nightly_price, project_listings, to_float, to_int
+import os
 import time
 
-# ANSI Color Codes
-class Colors:
-    HEADER = '\033[95m'      # Purple
-    BLUE = '\033[94m'        # Blue
-    GREEN = '\033[92m'       # Green
-    YELLOW = '\033[93m'      # Yellow
-    RED = '\033[91m'         # Red
-    ENDC = '\033[0m'         # Reset color
-    BOLD = '\033[1m'         # Bold
-    UNDERLINE = '\033[4m'    # Underline
+log = get_logger("airbnb_scraper")
+
+# Overridable so benchmarks can point the scraper at a local server.
+AIRBNB_BASE_URL = os.getenv("AIRBNB_BASE_URL", "https://www.airbnb.com").rstrip("/")
+
+# "bulk" pulls every card on a page in a single $$eval round trip;
+# "per_card" is the original element-by-element extraction, kept for comparison.
+EXTRACTION_MODE = os.getenv("AIRBNB_EXTRACTION_MODE", "bulk")
+
+CARD_SELECTOR = "div[itemprop='itemListElement']"
+
+# "parallel" builds the paginated search URLs directly and loads up to
+# AIRBNB_PAGE_CONCURRENCY of them at once; "click" follows the "Next" button.
+PAGINATION_MODE = os.getenv("AIRBNB_PAGINATION_MODE", "parallel")
+PAGE_CONCURRENCY = int(os.getenv("AIRBNB_PAGE_CONCURRENCY", "3"))
+# "light" aborts images, media, fonts and known trackers, treats a page as
+# loaded at DOMContentLoaded plus the first listing card, and uses a small
+# viewport; "full" loads pages the way a normal browser does.
+LOAD_PROFILE = os.getenv("AIRBNB_LOAD_PROFILE", "light")
+BLOCKED_RESOURCE_TYPES = frozenset(
+    t.strip() for t in os.getenv("AIRBNB_BLOCKED_RESOURCE_TYPES", "image,media,font").split(",") if t.strip()
+)
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googleadservices.com",
+    "facebook.net", "facebook.com", "bat.bing.com", "clarity.ms",
+    "hotjar.com", "segment.io", "ads.linkedin.com", "ct.pinterest.com", "sentry.io", "datadoghq.com", "branch.io", "tiktok.com",
+    *(d.strip() for d in os.getenv("AIRBNB_BLOCKED_DOMAINS", "").split(",") if d.strip()),
+)
+LIGHT_VIEWPORT = dict(zip(("width", "height"), map(int, os.getenv("AIRBNB_LIGHT_VIEWPORT", "1024x768").split("x"))))
+# Record bytes transferred and JS heap per results page (through CDP, so it costs a little).
+MEASURE_PAGES = os.getenv("AIRBNB_MEASURE_PAGES", "0") == "1"
+
+PAGE_SIZE = 18          # cards Airbnb renders per search results page
+MAX_RESULT_PAGES = 15   # Airbnb stops paginating after 15 pages
+
+LISTING_CACHE_PRICE_BUCKET = int(os.getenv("LISTING_CACHE_PRICE_BUCKET", "25"))
+# The first scrape for a location, guests and dates asks for a price cap
+# LISTING_OVERFETCH_PRICE_FACTOR times the requested one and at least
+# LISTING_OVERFETCH_LIMIT results, so later searches with other caps can be
+# answered from the listing index instead of scraping again.
+LISTING_OVERFETCH_ENABLED = os.getenv("LISTING_OVERFETCH_ENABLED", "1") == "1"
+LISTING_OVERFETCH_PRICE_FACTOR = float(os.getenv("LISTING_OVERFETCH_PRICE_FACTOR", "2"))
+LISTING_OVERFETCH_LIMIT = int(os.getenv("LISTING_OVERFETCH_LIMIT", "54"))
+
+# The listing index: one entry per location, guests and dates, holding every
+# listing scraped for them (see `_merge_index`).
+listing_cache = TTLCache(
+    "listings",
+    backend=make_backend(
+        os.getenv("LISTING_CACHE_BACKEND", "memory"),
+        namespace="listings",
+        max_entries=int(os.getenv("LISTING_CACHE_MAX_ENTRIES", "256")),
+        path=os.getenv("CACHE_DB_PATH", ".cache/trailmate.sqlite3"),
+    ),
+    ttl=float(os.getenv("LISTING_CACHE_TTL", "3600")),
+    # An empty result is usually a failed scrape, not an empty city.
+    should_cache=lambda value: bool(value and value["listings"]),
+)
+
+
+class ListingIndexStats:
+    def __init__(self):
+        self.scrapes = 0
+        self.overfetches = 0
+        self.from_broader_band = 0   # answered by a scrape made with a higher price cap
+        self.from_wider_dates = 0    # answered by a scrape of a date range containing the request's
+
+    def stats(self) -> dict:
+        return {
+            "scrapes": self.scrapes,
+            "overfetches": self.overfetches,
+            "from_broader_band": self.from_broader_band,
+            "from_wider_dates": self.from_wider_dates,
+        }
+
+
+listing_index_stats = ListingIndexStats()
+# (location, guests, check_in, check_out) of the date ranges indexed by this
+# process, oldest first, to find ranges that contain a requested one. Ranges
+# whose index entry has expired or been evicted are dropped when met, and no
+# more are kept than the listing cache can hold.
+_indexed_ranges: OrderedDict[tuple[str, int, str, str], None] = OrderedDict()
+# Airbnb discounts weekly and monthly stays, so a wider stay past one of
+# these lengths averages to a nightly rate the shorter stay won't get.
+STAY_DISCOUNT_NIGHTS = (7, 28)
+
+# Mirrors the Playwright selectors used by the per-card path. `:has-text()` is
+# case-insensitive, whitespace-normalized and trimmed, so `lax` does the same.
+_BULK_EXTRACT_JS = """
+(cards) => {
+    const lax = (s) => (s || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const hasText = (el, needle) => lax(el.textContent).includes(lax(needle));
+    const text = (el) => (el ? el.innerText : null);
+    return cards.map((card) => {
+        const spans = Array.from(card.querySelectorAll('span'));
+        const priceSpans = spans.filter((s) => hasText(s, '$'));
+        const link = card.querySelector('a');
+        return {
+            title: text(card.querySelector("div[data-testid='listing-card-title']")),
+            full_text: card.innerText,
+            price_text: priceSpans.length ? priceSpans[priceSpans.length - 1].innerText : null,
+            href: link ? link.getAttribute('href') : null,
+            area_text: text(Array.from(card.querySelectorAll('div')).find((d) => hasText(d, ' in '))),
+            rating_text: text(spans.find((s) => hasText(s, '(') && hasText(s, ')'))),
+        };
+    });
+}
+"""
+
+async def _extract_raw_cards(page) -> list[dict]:
+    """Return the raw text fields of every listing card on the current page."""
+    if EXTRACTION_MODE == "bulk":
+        return await page.eval_on_selector_all(CARD_SELECTOR, _BULK_EXTRACT_JS)
+
+    raw_cards = []
+    for card in await page.query_selector_all(CARD_SELECTOR):
+        try:
+            title_el = await card.query_selector("div[data-testid='listing-card-title']")
+            price_elements = await card.query_selector_all("span:has-text('$')")
+            link_element = await card.query_selector("a")
+            area_el = await card.query_selector("div:has-text(' in ')")
+            rating_el = await card.query_selector("span:has-text('('):has-text(')')")
+            raw_cards.append({
+                "title": await title_el.inner_text() if title_el else None,
+                "full_text": await card.inner_text(),
+                "price_text": await price_elements[-1].inner_text() if price_elements else None,
+                "href": await link_element.get_attribute("href") if link_element else None,
+                "area_text": await area_el.inner_text() if area_el else None,
+                "rating_text": await rating_el.inner_text() if rating_el else None,
+            })
+        except Exception as e:
+            log.warning("Error reading listing card: %s", e)
+    return raw_cards
+
+
+def _parse_card(raw: dict, location: str, check_in: str, check_out: str, nights: int) -> dict:
+    """Turn the raw card text returned by `_extract_raw_cards` into a listing dict."""
+    title = raw["title"].strip() if raw.get("title") is not None else "N/A"
+
+    subtitle = "N/A"
+    lines = [line.strip() for line in (raw.get("full_text") or "").split("\n") if line.strip()]
+    if title in lines:
+        idx = lines.index(title)
+        if idx + 1 < len(lines):
+            subtitle = lines[idx + 1]
+
+    price = "N/A"
+    if raw.get("price_text") is not None:
+        price = raw["price_text"].strip().replace('\n', ' ')
+
+    relative_link = raw.get("href")
+    url = f"{AIRBNB_BASE_URL}{relative_link}" if relative_link else "N/A"
+
+    area = "Unknown"
+    area_text = raw.get("area_text")
+    if area_text and " in " in area_text:
+        area = area_text.split(" in ")[-1].split("\n")[0].strip()
+
+    rating = "N/A"
+    reviews = "N/A"
+    rating_text = raw.get("rating_text")
+    if rating_text is not None:
+        match = re.match(r"(\d+\.\d+)\s*\((\d+)\)", rating_text)
+        if match:
+            rating, reviews = match.groups()
+        else:
+            rating_only = re.search(r"\d+\.\d+", rating_text)
+            review_count = re.search(r"\((\d+)\)", rating_text)
+            if rating_only:
+                rating = rating_only.group()
+            if review_count:
+                reviews = review_count.group(1)
+
+    return {
+        "title": title,
+        "subtitle": subtitle,
+        "price": price,
+        "url": url,
+        "location": location,
+        "area": area,
+        "rating": rating,
+        "reviews": reviews,
+        "check_in": check_in,
+        "check_out": check_out,
+        "nights": nights,
+    }
+
 
 @function_tool
 async def scrape_airbnb(
@@ -26,8 +223,11 @@ async def scrape_airbnb(
     check_out: str,
     limit: str = "20"  # accept as string
 ):
-    print(f"{Colors.YELLOW}[TOOL] scrape_airbnb called with location='{location}', guests={guests}, max_price={max_price}, check_in={check_in}, check_out={check_out}, limit={limit}{Colors.ENDC}")
-    start_time = time.time()
+    log.info(
+        "scrape_airbnb called",
+        extra={"location": location, "guests": guests, "max_price": max_price,
+               "check_in": check_in, "check_out": check_out, "limit": limit},
+    )
     """
     Scrape Airbnb accommodation listings for a given location and date range.
 
@@ -44,18 +244,15 @@ async def scrape_airbnb(
         limit (int, optional): Maximum number of listings to retrieve. Defaults to 20.
 
     Returns:
-        list[dict]: A list of dictionaries, each containing details of a listing:
+        list[dict]: Listings ranked by rating and trimmed to the tool output
+        token budget, each containing:
             - title (str): Listing title.
             - subtitle (str): Listing subtitle or description.
-            - price (str): Price per night.
-            - url (str): Direct URL to the listing.
-            - location (str): Search location.
             - area (str): Specific area/neighborhood.
-            - rating (str): Listing rating (if available).
-            - reviews (str): Number of reviews (if available).
-            - check_in (str): Check-in date.
-            - check_out (str): Check-out date.
-            - nights (int): Number of nights between check-in and check-out.
+            - nightly_price (float | None): Price per night in USD.
+            - rating (float | None): Listing rating (if available).
+            - reviews (int | None): Number of reviews (if available).
+            - url (str): Direct URL to the listing.
 
     Raises:
         Exception: If navigation, scraping, or page interaction fails at any step.
@@ -70,125 +267,513 @@ async def scrape_airbnb(
             limit=10
         )
     """
-    listings = []
-
     # Safely cast numeric parameters
     guests_int = int(guests)
     max_price_int = int(max_price)
     limit_int = int(limit)
 
+    # The tool wants the whole list, so it goes through the index with
+    # single-flight and over-fetching rather than streaming.
+    with timed("tool", "scrape_airbnb"):
+        listings = await search_listings(location, guests_int, max_price_int, check_in, check_out, limit_int)
+
+    log.info("scrape_airbnb finished with %d listings", len(listings))
+    return project_listings(listings)
+
+
+def _normalize_location(location: str) -> str:
+    return " ".join(location.lower().replace(",", " ").split())
+
+
+def listing_cache_key(location: str, guests: int, check_in: str, check_out: str) -> str:
+    """Listing index key. Price caps aren't part of it: one entry answers every cap."""
+    return json.dumps([_normalize_location(location), guests, check_in, check_out])
+
+
+def _price_bucket(max_price: int) -> int:
+    return math.ceil(max_price / LISTING_CACHE_PRICE_BUCKET) * LISTING_CACHE_PRICE_BUCKET
+
+
+def _nights(check_in: str, check_out: str) -> int:
+    return (datetime.strptime(check_out, "%Y-%m-%d") - datetime.strptime(check_in, "%Y-%m-%d")).days
+
+
+def _merge_index(index: dict | None, max_price: int, limit: int, listings: list[dict], nights: int) -> dict:
+    """
+    Add one scrape (made with `max_price` and `limit`) to an index entry:
+
+        {"bands": [{"max_price": 400, "limit": 54, "found": 54}, ...],
+         "listings": [{"nightly_price": 152.0, "rating": 4.8, "reviews": 120,
+                       "area": "Le Marais", "listing": {...}}, ...]}
+
+    Listings are kept in scrape order and de-duplicated by `listing_key`. A
+    band that found fewer than its limit holds every listing up to its price cap.
+    """
+    index = index or {"bands": [], "listings": []}
+    seen = {listing_key(entry["listing"]) for entry in index["listings"]}
+    merged = list(index["listings"])
+    for listing in listings:
+        key = listing_key(listing)
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append({
+            "nightly_price": parse_nightly_price(listing["price"], nights),
+            "rating": to_float(listing.get("rating")),
+            "reviews": to_int(listing.get("reviews")),
+            "area": listing.get("area"),
+            "listing": listing,
+        })
+    bands = index["bands"] + [{"max_price": max_price, "limit": limit, "found": len(listings)}]
+    return {"bands": bands, "listings": merged}
+
+
+def _query_index(index: dict, max_price: int, limit: int, allow_exhausted: bool = True) -> tuple[list[dict], bool]:
+    """
+    Indexed entries at or under `max_price` per night, up to `limit`, and
+    whether that is a complete answer: `limit` of them, or (with
+    `allow_exhausted`) a band that ran out of results at a cap >= `max_price`.
+    """
+    matches = [e for e in index["listings"] if e["nightly_price"] is None or e["nightly_price"] <= max_price]
+    complete = len(matches) >= limit or (allow_exhausted and any(
+        band["found"] < band["limit"] and band["max_price"] >= max_price for band in index["bands"]
+    ))
+    return matches[:limit], complete
+
+
+def _remember_range(location: str, guests: int, check_in: str, check_out: str):
+    key = (_normalize_location(location), guests, check_in, check_out)
+    _indexed_ranges[key] = None
+    _indexed_ranges.move_to_end(key)
+    while len(_indexed_ranges) > listing_cache.backend.max_entries:
+        _indexed_ranges.popitem(last=False)
+
+
+def _same_discount_tier(nights: int, wide_nights: int) -> bool:
+    return all((nights >= threshold) == (wide_nights >= threshold) for threshold in STAY_DISCOUNT_NIGHTS)
+
+
+async def _from_wider_dates(location: str, guests: int, max_price: int, check_in: str, check_out: str, limit: int) -> list[dict] | None:
+    """
+    Answer from an indexed date range that contains [check_in, check_out]: a
+    listing free for the whole range is free for part of it. Nightly prices
+    are the wider stay's average, so they are marked `price_estimated`, and
+    wider stays long enough for a weekly or monthly discount the requested
+    one won't get are skipped. Only a full `limit` of matches counts (running
+    out of results for the wider range says nothing about this one).
+    """
+    location_key = _normalize_location(location)
+    nights = _nights(check_in, check_out)
+    wider = sorted(
+        key for key in _indexed_ranges
+        if key[:2] == (location_key, guests) and key[2] <= check_in and check_out <= key[3] and key[2:] != (check_in, check_out)
+    )
+    for key in wider:
+        _, _, wide_in, wide_out = key
+        index = await listing_cache.peek(listing_cache_key(location, guests, wide_in, wide_out))
+        if index is None:
+            del _indexed_ranges[key]
+            continue
+        if not _same_discount_tier(nights, _nights(wide_in, wide_out)):
+            continue
+        matches, complete = _query_index(index, max_price, limit, allow_exhausted=False)
+        if complete:
+            return [
+                {
+                    **entry["listing"],
+                    "price": f"${entry['nightly_price']:.2f} night" if entry["nightly_price"] is not None else entry["listing"]["price"],
+                    "price_estimated": entry["nightly_price"] is not None,
+                    "url": (
+                        f"{listing_key(entry['listing'])}?adults={guests}&check_in={check_in}&check_out={check_out}"
+                        if entry["listing"]["url"] != "N/A" else "N/A"
+                    ),
+                    "check_in": check_in,
+                    "check_out": check_out,
+                    "nights": nights,
+                }
+                for entry in matches
+            ]
+    return None
+
+
+async def search_listings(location: str, guests: int, max_price: int, check_in: str, check_out: str, limit: int = 20) -> list[dict]:
+    """
+    Accommodation search through the listing index. A search is answered
+    without scraping when the index holds `limit` listings under `max_price`
+    for these dates (or for a date range containing them), or a scrape that
+    ran out of results at a cap >= `max_price`. Otherwise a scrape runs and is
+    merged into the index; the first one for a location and dates over-fetches
+    a wider price band.
+    """
+    nights = _nights(check_in, check_out)
+    key = listing_cache_key(location, guests, check_in, check_out)
+
+    if await listing_cache.peek(key) is None:
+        listings = await _from_wider_dates(location, guests, max_price, check_in, check_out, limit)
+        if listings is not None:
+            listing_index_stats.from_wider_dates += 1
+            return listings
+
+    scraped = False
+
+    async def load():
+        nonlocal scraped
+        scraped = True
+        index = await listing_cache.peek(key)
+        scrape_price, scrape_limit = _price_bucket(max_price), limit
+        if index is None and LISTING_OVERFETCH_ENABLED:
+            scrape_price = _price_bucket(max_price * LISTING_OVERFETCH_PRICE_FACTOR)
+            scrape_limit = max(limit, LISTING_OVERFETCH_LIMIT)
+            listing_index_stats.overfetches += 1
+        listing_index_stats.scrapes += 1
+        listings = await _scrape_listings(location, guests, scrape_price, check_in, check_out, scrape_limit)
+        return _merge_index(index, scrape_price, scrape_limit, listings, nights)
+
+    def answers(index: dict) -> bool:
+        return _query_index(index, max_price, limit)[1]
+
+    # A joined scrape that doesn't cover this search is rejected by `answers`
+    # and the cache loads again for us.
+    index = await listing_cache.get_or_load(key, load, accept=answers)
+    matches, _ = _query_index(index, max_price, limit)
+
+    _remember_range(location, guests, check_in, check_out)
+    if not scraped and any(band["max_price"] > max_price for band in index["bands"]):
+        listing_index_stats.from_broader_band += 1
+    return [entry["listing"] for entry in matches]
+
+
+async def iter_listings(location: str, guests: int, max_price: int, check_in: str, check_out: str, limit: int = 20):
+    """
+    Streaming variant of `search_listings`: yields up to `limit` listings at
+    or under `max_price` per night as each result card is parsed, so callers
+    can stop as soon as they have what they need. Stopping early cancels the
+    page loads still in flight; close the generator to do it promptly:
+
+        async with aclosing(iter_listings("Paris", 2, 250, "2025-09-15", "2025-09-20", limit=60)) as listings:
+            top = []
+            async for listing in listings:
+                if (to_float(listing["rating"]) or 0) >= 4.8:
+                    top.append(listing)
+                    if len(top) == 5:
+                        break
+
+    Answers the listing index can give are yielded from it. Otherwise the
+    scrape streams (without over-fetching, so the first card arrives sooner)
+    and whatever it found is merged into the index when the generator ends.
+    A scrape that was stopped early isn't recorded as having run out of results.
+
+    A streamed scrape isn't registered as the cache's in-flight load, so
+    concurrent identical streams each scrape; callers that want the whole
+    list should use `search_listings`.
+    """
+    nights = _nights(check_in, check_out)
+    key = listing_cache_key(location, guests, check_in, check_out)
+    _remember_range(location, guests, check_in, check_out)
+
+    if await listing_cache.peek(key) is None:
+        listings = await _from_wider_dates(location, guests, max_price, check_in, check_out, limit)
+        if listings is not None:
+            listing_index_stats.from_wider_dates += 1
+            for listing in listings:
+                yield listing
+            return
+
+    index = await listing_cache.get(key, accept=lambda index: _query_index(index, max_price, limit)[1])
+    if index is None and listing_cache.is_loading(key):
+        # Another search is scraping these dates; share its result.
+        for listing in await search_listings(location, guests, max_price, check_in, check_out, limit):
+            yield listing
+        return
+    if index is not None:
+        for entry in _query_index(index, max_price, limit)[0]:
+            yield entry["listing"]
+        return
+
+    scrape_price = _price_bucket(max_price)
+    scraped = []
+    finished = False
+    listing_index_stats.scrapes += 1
+    try:
+        async with aclosing(_iter_scraped_listings(location, guests, scrape_price, check_in, check_out, limit)) as cards:
+            async for listing in cards:
+                scraped.append(listing)
+                nightly = parse_nightly_price(listing["price"], nights)
+                if nightly is None or nightly <= max_price:
+                    yield listing
+        finished = True
+    finally:
+        if scraped:
+            band_limit = limit if finished else len(scraped)
+            await listing_cache.set(key, _merge_index(await listing_cache.peek(key), scrape_price, band_limit, scraped, nights))
+
+
+def _is_tracker(url: str) -> bool:
+    host = urlsplit(url).hostname or ""
+    return any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS)
+
+
+async def _block_heavy_resources(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        scrape_blocked_requests.inc(reason=request.resource_type)
+        await route.abort()
+    elif _is_tracker(request.url):
+        scrape_blocked_requests.inc(reason="tracker")
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+@asynccontextmanager
+async def search_context(profile: str | None = None):
+    """A pooled browser context set up for loading search results with `profile` (default LOAD_PROFILE)."""
+    profile = profile or LOAD_PROFILE
+    options = {"viewport": LIGHT_VIEWPORT} if profile == "light" else {}
+    async with browser_pool.context(**options) as context:
+        if profile == "light":
+            await context.route("**/*", _block_heavy_resources)
+        yield context
+
+
+async def open_results_page(page, url: str, profile: str | None = None, card_timeout: int = 15000) -> dict:
+    """
+    Navigate to a search results page and wait for the first listing card.
+    Returns `{"ready_seconds", "bytes", "heap_bytes"}`; the last two are only
+    measured with AIRBNB_MEASURE_PAGES=1 and are None otherwise.
+    Raises PlaywrightTimeoutError if no card shows up within `card_timeout` ms.
+    """
+    profile = profile or LOAD_PROFILE
+    cdp = None
+    transferred = 0
+    if MEASURE_PAGES:
+        cdp = await page.context.new_cdp_session(page)
+        await cdp.send("Network.enable")
+        await cdp.send("Performance.enable")
+
+        def on_loaded(event):
+            nonlocal transferred
+            transferred += event.get("encodedDataLength", 0)
+
+        cdp.on("Network.loadingFinished", on_loaded)
+
+    started = time.perf_counter()
+    try:
+        with timed("navigation", "airbnb_search", profile=profile):
+            await page.goto(url, timeout=60000, wait_until="domcontentloaded" if profile == "light" else "load")
+            await page.wait_for_selector(CARD_SELECTOR, timeout=card_timeout)
+        ready = time.perf_counter() - started
+        scrape_page_ready_seconds.observe(ready, profile=profile)
+
+        heap = None
+        if cdp is not None:
+            metrics = {m["name"]: m["value"] for m in (await cdp.send("Performance.getMetrics"))["metrics"]}
+            heap = metrics.get("JSHeapUsedSize")
+            scrape_page_bytes.observe(transferred, profile=profile)
+            if heap is not None:
+                scrape_page_heap_bytes.observe(heap, profile=profile)
+        return {"ready_seconds": ready, "bytes": transferred if cdp is not None else None, "heap_bytes": heap}
+    finally:
+        if cdp is not None:
+            try:
+                await cdp.detach()
+            except Exception:
+                pass
+
+
+class _ScrapeProgress:
+    def __init__(self):
+        self.pages = 0
+
+
+async def _scrape_listings(location: str, guests: int, max_price: int, check_in: str, check_out: str, limit: int) -> list[dict]:
+    async with aclosing(_iter_scraped_listings(location, guests, max_price, check_in, check_out, limit)) as scraped:
+        return [listing async for listing in scraped]
+
+
+async def _iter_scraped_listings(location: str, guests: int, max_price: int, check_in: str, check_out: str, limit: int):
+    """Scrape the search results, yielding each listing as its card is parsed."""
+    nights = _nights(check_in, check_out)
+
     search_url = (
-        f"https://www.airbnb.com/s/{location}/homes"
-        f"?adults={guests_int}&price_max={max_price_int}"
+        f"{AIRBNB_BASE_URL}/s/{location}/homes"
+        f"?adults={guests}&price_max={max_price}"
         f"&check_in={check_in}&check_out={check_out}"
     )
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
+    def parse(raw: dict) -> dict:
+        return _parse_card(raw, location, check_in, check_out, nights)
+
+    progress = _ScrapeProgress()
+    count = 0
+    started = time.perf_counter()
+    try:
+        async with search_context() as context:
+            if PAGINATION_MODE == "parallel":
+                pages = _scrape_pages_parallel(context, search_url, limit, parse, progress)
+            else:
+                pages = _scrape_pages_by_clicking(context, search_url, limit, parse, progress)
+            async with aclosing(pages):
+                async for listing in pages:
+                    count += 1
+                    yield listing
+    finally:
+        elapsed = time.perf_counter() - started
+        if progress.pages:
+            scrape_pages_per_second.observe(progress.pages / elapsed)
+        log.info(
+            "Scraped %d listings from %d page(s) in %.2fs", count, progress.pages, elapsed,
+            extra={"pages_per_second": round(progress.pages / elapsed, 3)},
+        )
+
 
-        print(f"{Colors.BLUE}[TOOL] Navigating to Airbnb search: {search_url}{Colors.ENDC}")
-        await page.goto(search_url, timeout=60000)
+def _page_url(search_url: str, page_index: int) -> str:
+    """Build the URL of a results page directly instead of clicking "Next"."""
+    if page_index == 0:
+        return search_url
+    offset = page_index * PAGE_SIZE
+    cursor = base64.b64encode(
+        json.dumps({"section_offset": 0, "items_offset": offset, "version": 1}, separators=(",", ":")).encode()
+    ).decode()
+    return f"{search_url}&pagination_search=true&items_offset={offset}&cursor={quote(cursor)}"
 
-        # Wait for listing cards to load
-        await page.wait_for_selector("div[itemprop='itemListElement']", timeout=15000)
 
-        while len(listings) < limit_int:
+async def _scrape_pages_parallel(context, search_url: str, limit: int, parse, progress: _ScrapeProgress):
+    """
+    Load result pages concurrently in tabs of one context, at most
+    PAGE_CONCURRENCY at a time, and yield their listings in page order.
+    `progress.pages` counts the pages used.
+
+    Only as many pages as `limit` needs are requested; more are scheduled if
+    duplicates or short pages leave us below `limit`. Outstanding pages are
+    cancelled as soon as `limit` is reached or the consumer stops iterating.
+    """
+    semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+    async def fetch(page_index: int) -> list[dict]:
+        async with semaphore, governor.browser_pages.slot():
+            page = await context.new_page()
             try:
-                await page.wait_for_selector("div[itemprop='itemListElement']", timeout=10000)
-                cards = await page.query_selector_all("div[itemprop='itemListElement']")
-                print(f"{Colors.BLUE}[TOOL] Found {len(cards)} listings on current page{Colors.ENDC}")
+                url = _page_url(search_url, page_index)
+                log.debug("Navigating to Airbnb search page %d: %s", page_index + 1, url)
+                try:
+                    await open_results_page(page, url)
+                except PlaywrightTimeoutError:
+                    if page_index == 0:
+                        raise
+                    return []  # past the last page of results
+                return await _extract_raw_cards(page)
+            finally:
+                await page.close()
 
-                for card in cards:
-                    if len(listings) >= limit_int:
-                        break
+    found = 0
+    seen = set()
+    tasks: dict[int, asyncio.Task] = {}
+    next_index = 0
 
-                    try:
-                        title_el = await card.query_selector("div[data-testid='listing-card-title']")
-                        title = (await title_el.inner_text()).strip() if title_el else "N/A"
-
-                        subtitle = "N/A"
-                        full_text = await card.inner_text()
-                        lines = [line.strip() for line in full_text.split("\n") if line.strip()]
-                        if title in lines:
-                            idx = lines.index(title)
-                            if idx + 1 < len(lines):
-                                subtitle = lines[idx + 1]
-
-                        price = "N/A"
-                        price_elements = await card.query_selector_all("span:has-text('$')")
-                        if price_elements:
-                            price = (await price_elements[-1].inner_text()).strip().replace('\n', ' ')
-
-                        link_element = await card.query_selector("a")
-                        relative_link = await link_element.get_attribute("href") if link_element else None
-                        url = f"https://www.airbnb.com{relative_link}" if relative_link else "N/A"
-
-                        area = "Unknown"
-                        area_el = await card.query_selector("div:has-text(' in ')")
-                        if area_el:
-                            area_text = await area_el.inner_text()
-                            if " in " in area_text:
-                                area = area_text.split(" in ")[-1].split("\n")[0].strip()
-
-                        rating = "N/A"
-                        reviews = "N/A"
-                        rating_el = await card.query_selector("span:has-text('('):has-text(')')")
-                        if rating_el:
-                            rating_text = await rating_el.inner_text()
-                            match = re.match(r"(\d+\.\d+)\s*\((\d+)\)", rating_text)
-                            if match:
-                                rating, reviews = match.groups()
-                            else:
-                                rating_only = re.search(r"\d+\.\d+", rating_text)
-                                review_count = re.search(r"\((\d+)\)", rating_text)
-                                if rating_only:
-                                    rating = rating_only.group()
-                                if review_count:
-                                    reviews = review_count.group(1)
-
-                        listings.append({
-                            "title": title,
-                            "subtitle": subtitle,
-                            "price": price,
-                            "url": url,
-                            "location": location,
-                            "area": area,
-                            "rating": rating,
-                            "reviews": reviews,
-                            "check_in": check_in,
-                            "check_out": check_out,
-                            "nights": (datetime.strptime(check_out, "%Y-%m-%d") - datetime.strptime(check_in, "%Y-%m-%d")).days
-                        })
-
-                    except Exception as e:
-                        print(f"{Colors.RED}[TOOL] Error parsing listing: {e}{Colors.ENDC}")
-
-                # Try to click next page if needed
-                if len(listings) < limit_int:
-                    next_btn = await page.query_selector("a[aria-label='Next']")
-                    if next_btn:
-                        try:
-                            await next_btn.scroll_into_view_if_needed()
-                            await next_btn.click(force=True)
-                            print(f"{Colors.BLUE}[TOOL] Navigating to next page...{Colors.ENDC}")
-                            await page.wait_for_selector("div[itemprop='itemListElement']", timeout=10000)
-                        except PlaywrightTimeoutError as e:
-                            print(f"{Colors.RED}[TOOL] Timeout while clicking next page. Exiting.{Colors.ENDC}")
-                            break
-                    else:
-                        print(f"{Colors.YELLOW}[TOOL] No more pages.{Colors.ENDC}")
-                        break
+    def schedule(count: int):
+        nonlocal next_index
+        for _ in range(count):
+            if next_index >= MAX_RESULT_PAGES:
+                return
+            tasks[next_index] = asyncio.create_task(fetch(next_index))
+            next_index += 1
 
+    schedule(math.ceil(limit / PAGE_SIZE))
+    index = 0
+    try:
+        while index in tasks and found < limit:
+            try:
+                raw_cards = await tasks.pop(index)
             except Exception as e:
-                print(f"{Colors.RED}[TOOL] Error while scraping page: {e}{Colors.ENDC}")
+                scrape_pages.inc(outcome="error")
+                log.warning("Error while scraping page %d: %s", index + 1, e)
                 break
+            index += 1
+            progress.pages = index
+            scrape_pages.inc(outcome="ok" if raw_cards else "empty")
+            log.debug("Found %d listings on page %d", len(raw_cards), index)
+            if not raw_cards:
+                break
+
+            for raw in raw_cards:
+                if found >= limit:
+                    break
+                try:
+                    listing = parse(raw)
+                except Exception as e:
+                    log.warning("Error parsing listing: %s", e)
+                    continue
+                key = listing_key(listing)
+                if key in seen:
+                    continue
+                seen.add(key)
+                found += 1
+                yield listing
+
+            if found < limit and index == next_index:
+                schedule(math.ceil((limit - found) / PAGE_SIZE))
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+async def _scrape_pages_by_clicking(context, search_url: str, limit_int: int, parse, progress: _ScrapeProgress):
+    """Original pagination: one tab, clicking "Next" until `limit_int` is reached."""
+    async with governor.browser_pages.slot():
+        page = await context.new_page()
+        async with aclosing(_click_through_pages(page, search_url, limit_int, parse, progress)) as listings:
+            async for listing in listings:
+                yield listing
+
+
+async def _click_through_pages(page, search_url: str, limit_int: int, parse, progress: _ScrapeProgress):
+    found = 0
+
+    log.debug("Navigating to Airbnb search: %s", search_url)
+    await open_results_page(page, search_url)
+
+    while found < limit_int:
+        try:
+            await page.wait_for_selector(CARD_SELECTOR, timeout=10000)
+            raw_cards = await _extract_raw_cards(page)
+            progress.pages += 1
+            scrape_pages.inc(outcome="ok" if raw_cards else "empty")
+            log.debug("Found %d listings on current page", len(raw_cards))
+
+            for raw in raw_cards:
+                if found >= limit_int:
+                    break
+
+                try:
+                    listing = parse(raw)
+                except Exception as e:
+                    log.warning("Error parsing listing: %s", e)
+                    continue
+                found += 1
+                yield listing
+
+            # Try to click next page if needed
+            if found < limit_int:
+                next_btn = await page.query_selector("a[aria-label='Next']")
+                if next_btn:
+                    try:
+                        await next_btn.scroll_into_view_if_needed()
+                        await next_btn.click(force=True)
+                        log.debug("Navigating to next page")
+                        await page.wait_for_selector(CARD_SELECTOR, timeout=10000)
+                    except PlaywrightTimeoutError as e:
+                        log.warning("Timeout while clicking next page, stopping")
+                        break
+                else:
+                    log.debug("No more pages")
+                    break
 
-        await browser.close()
-        duration = time.time() - start_time
-        print(f"{Colors.GREEN}[TOOL] scrape_airbnb finished – {len(listings)} listings in {duration:.2f}s{Colors.ENDC}")
-        return listings
+        except Exception as e:
+            scrape_pages.inc(outcome="error")
+            log.warning("Error while scraping page: %s", e)
+            break
 
 
 # async def main():
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import random
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from observability import get_logger
+
+log = get_logger("answer_cache")
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+# Minimum Jaccard similarity of two questions' content words for one to reuse
+# the other's answer; 1 disables near-duplicate matching (exact matches only).
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.8"))
+
+# MinHash signature length, split into LSH bands of NUM_PERMUTATIONS // LSH_BANDS rows.
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+_PRIME = (1 << 61) - 1
+
+# Words that don't change what is being asked. Question words (when/where/
+# why...) and direction words (to/from) do, so they are kept.
+STOPWORDS = frozenset("""
+    a an the is are was were be been am do does did can could would should will shall may might must
+    i me my we us our you your it its this that these those there here s
+    of in on at for by with about over as and or but if so than then
+    please tell know any some much many really just also very
+""".split())
+ALIASES = {"whats": "what", "whens": "when", "wheres": "where", "hows": "how"}
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def content_words(normalized: str) -> frozenset[str]:
+    """
+    The question's content words, with plural "s" dropped so "beaches" ~
+    "beach", plus each adjacent pair in order, so "Paris to Rome" and "Rome
+    to Paris" differ.
+    """
+    words = []
+    for word in normalized.split():
+        word = ALIASES.get(word, word)
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-2] if word.endswith(("ches", "shes", "sses", "xes", "zes")) else word[:-1]
+        words.append(word)
+    return frozenset(words) | frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+
+
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def minhash(tokens: frozenset[str]) -> tuple[int, ...]:
+    hashes = [_token_hash(t) for t in tokens]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class _Entry:
+    answer: str
+    words: frozenset[str]
+    bands: tuple[int, ...]
+    stored_at: float
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of answers to free-form questions.
+
+    Lookups first try the normalized question text. Failing that, questions
+    whose content words have Jaccard similarity >= `threshold` count as the
+    same question: MinHash signatures bucketed by LSH bands find the candidates
+    without scanning every entry, and the exact Jaccard of the word sets
+    decides. Entries expire after `ttl` seconds; the least recently used are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, threshold: float):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bands: list[dict[int, set[str]]] = [{} for _ in range(LSH_BANDS)]
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _band_keys(words: frozenset[str]) -> tuple[int, ...]:
+        signature = minhash(words)
+        rows = NUM_PERMUTATIONS // LSH_BANDS
+        return tuple(hash(signature[i * rows:(i + 1) * rows]) for i in range(LSH_BANDS))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for band, bucket_key in zip(self._bands, entry.bands):
+            bucket = band.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del band[bucket_key]
+
+    def _fresh(self, key: str) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.stored_at > self.ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, words: frozenset[str]) -> tuple[str, float] | None:
+        candidates = set()
+        for band, bucket_key in zip(self._bands, self._band_keys(words)):
+            candidates |= band.get(bucket_key, set())
+        best = None
+        for key in candidates:
+            similarity = jaccard(words, self._entries[key].words)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def get(self, question: str) -> str | None:
+        """Return the cached answer to `question` or a near-duplicate of it, or None."""
+        key = normalize_question(question)
+        entry = self._fresh(key)
+        if entry is not None:
+            self.exact_hits += 1
+            return entry.answer
+
+        words = content_words(key)
+        if words and self.threshold < 1:
+            match = self._nearest(words)
+            if match is not None:
+                entry = self._fresh(match[0])
+                if entry is not None:
+                    self.similar_hits += 1
+                    log.debug("Near-duplicate question", extra={"question": key, "matched": match[0], "similarity": round(match[1], 3)})
+                    return entry.answer
+
+        self.misses += 1
+        return None
+
+    def set(self, question: str, answer: str):
+        if not answer:
+            return
+        key = normalize_question(question)
+        if key in self._entries:
+            self._remove(key)
+        words = content_words(key)
+        entry = _Entry(answer, words, self._band_keys(words) if words else (), time.time())
+        self._entries[key] = entry
+        for band, bucket_key in zip(self._bands, entry.bands):
+            band.setdefault(bucket_key, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "similarity_threshold": self.threshold,
+        }
+
+
+general_info_cache = SemanticAnswerCache(
+    "general_info",
+    ttl=ANSWER_CACHE_TTL,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    threshold=ANSWER_CACHE_SIMILARITY,
+)
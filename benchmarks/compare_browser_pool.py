@@ -0,0 +1,106 @@
+"""
+Compare scraping through the shared browser pool with launching Chromium for
+every scrape (what scrape_airbnb did before the pool): per-scrape latency and
+scrapes per second at a given concurrency.
+
+    python benchmarks/compare_browser_pool.py --scrapes 20 --concurrency 4
+    python benchmarks/compare_browser_pool.py --url "https://www.airbnb.com/s/Lisbon/homes?adults=2"
+
+Without `--url` it loads the local Airbnb stand-in.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from airbnb_scraper import _extract_raw_cards  # noqa: E402
+from browser_pool import browser_pool  # noqa: E402
+from run_benchmark import summarize  # noqa: E402
+from standins import BackgroundServer, fake_airbnb_app  # noqa: E402
+
+
+async def scrape_cold(url: str) -> dict:
+    started = time.perf_counter()
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        launched = time.perf_counter()
+        try:
+            page = await browser.new_page()
+            await page.goto(url)
+            cards = len(await _extract_raw_cards(page))
+        finally:
+            await browser.close()
+    return {"seconds": time.perf_counter() - started, "launch_seconds": launched - started, "cards": cards}
+
+
+async def scrape_pooled(url: str) -> dict:
+    started = time.perf_counter()
+    async with browser_pool.context() as context:
+        page = await context.new_page()
+        await page.goto(url)
+        cards = len(await _extract_raw_cards(page))
+    return {"seconds": time.perf_counter() - started, "launch_seconds": 0.0, "cards": cards}
+
+
+async def measure(scrape, url: str, scrapes: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await scrape(url)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(scrapes)))
+    elapsed = time.perf_counter() - started
+    return {
+        "scrape_ms": summarize([r["seconds"] * 1000 for r in results]),
+        "launch_ms": summarize([r["launch_seconds"] * 1000 for r in results]),
+        "scrapes_per_second": round(scrapes / elapsed, 3),
+        "cards": min(r["cards"] for r in results),
+    }
+
+
+async def main(args) -> dict:
+    server = None
+    url = args.url
+    if url is None:
+        server = BackgroundServer(fake_airbnb_app(args.latency)).start()
+        url = f"{server.url}/s/Lisbon/homes?adults=2"
+    try:
+        report = {"cold": await measure(scrape_cold, url, args.scrapes, args.concurrency)}
+        # Warm-up happens at app startup, so it isn't part of the pooled numbers.
+        await browser_pool.start()
+        report["pool"] = await measure(scrape_pooled, url, args.scrapes, args.concurrency)
+    finally:
+        await browser_pool.stop()
+        if server is not None:
+            server.stop()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="search results page to load (default: local stand-in)")
+    parser.add_argument("--scrapes", type=int, default=12, help="page scrapes per mode")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1, help="stand-in page latency (s)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    print(json.dumps(report, indent=2))
+    cold, pool = report["cold"], report["pool"]
+    for label, new, old in (
+        ("scrape p50 (ms)", pool["scrape_ms"]["p50"], cold["scrape_ms"]["p50"]),
+        ("scrape p95 (ms)", pool["scrape_ms"]["p95"], cold["scrape_ms"]["p95"]),
+        ("scrapes per second", pool["scrapes_per_second"], cold["scrapes_per_second"]),
+    ):
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"  {label:<20} cold {old:>10.1f}  pool {new:>10.1f}  {change}")
@@ -0,0 +1,82 @@
+"""
+Compare the Airbnb scraper's page load profiles ("light" vs "full"): page-ready
+time, bytes transferred and JS heap per results page.
+
+    python benchmarks/compare_load_profiles.py --pages 10
+    python benchmarks/compare_load_profiles.py --url "https://www.airbnb.com/s/Lisbon/homes?adults=2"
+
+Without `--url` it loads the local Airbnb stand-in, whose cards carry photos
+and a web font.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+from pathlib import Path
+
+# Measure bytes and heap through CDP; must be set before the scraper is imported.
+os.environ["AIRBNB_MEASURE_PAGES"] = "1"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from airbnb_scraper import _extract_raw_cards, open_results_page, search_context  # noqa: E402
+from browser_pool import browser_pool  # noqa: E402
+from run_benchmark import summarize  # noqa: E402
+from standins import BackgroundServer, fake_airbnb_app  # noqa: E402
+
+
+async def measure(url: str, profile: str, pages: int) -> dict:
+    loads = []
+    for _ in range(pages):
+        async with search_context(profile) as context:
+            page = await context.new_page()
+            load = await open_results_page(page, url, profile)
+            load["cards"] = len(await _extract_raw_cards(page))
+            loads.append(load)
+    return {
+        "ready_ms": summarize([l["ready_seconds"] * 1000 for l in loads]),
+        "kb_transferred": round(statistics.fmean(l["bytes"] for l in loads) / 1024, 1),
+        "heap_mb": round(statistics.fmean(l["heap_bytes"] or 0 for l in loads) / 2**20, 2),
+        "cards": min(l["cards"] for l in loads),
+    }
+
+
+async def main(args) -> dict:
+    server = None
+    url = args.url
+    if url is None:
+        server = BackgroundServer(fake_airbnb_app(args.latency, image_kb=args.image_kb)).start()
+        url = f"{server.url}/s/Lisbon/homes?adults=2"
+    try:
+        await browser_pool.start()
+        report = {profile: await measure(url, profile, args.pages) for profile in args.profiles}
+    finally:
+        await browser_pool.stop()
+        if server is not None:
+            server.stop()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="search results page to load (default: local stand-in)")
+    parser.add_argument("--pages", type=int, default=5, help="page loads per profile")
+    parser.add_argument("--profiles", nargs="+", default=["full", "light"])
+    parser.add_argument("--latency", type=float, default=0.1, help="stand-in page latency (s)")
+    parser.add_argument("--image-kb", type=int, default=40, help="stand-in photo size")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    print(json.dumps(report, indent=2))
+    if {"full", "light"} <= report.keys():
+        full, light = report["full"], report["light"]
+        for label, new, old in (
+            ("ready p50 (ms)", light["ready_ms"]["p50"], full["ready_ms"]["p50"]),
+            ("transferred (KB)", light["kb_transferred"], full["kb_transferred"]),
+            ("JS heap (MB)", light["heap_mb"], full["heap_mb"]),
+        ):
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {label:<20} full {old:>10.1f}  light {new:>10.1f}  {change}")
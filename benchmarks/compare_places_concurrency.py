@@ -0,0 +1,96 @@
+"""
+Check that concurrent Places lookups overlap instead of queuing behind each
+other: N `fetch_attractions` calls for N distinct destinations against the
+Places stand-in, with `places_cache` off, timed against N x the stub latency
+(what the calls would take if they ran one after another).
+
+    python benchmarks/compare_places_concurrency.py --levels 1,2,4,8 --latency 0.2
+
+The governor's Places rate limit is raised out of the way, so only the lookup
+path is measured. Levels above PLACES_MAX_WORKERS queue on the thread pool by
+design.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from run_benchmark import summarize  # noqa: E402
+from standins import BackgroundServer, fake_places_app  # noqa: E402
+
+
+def configure(places_url: str, args) -> None:
+    """Point Research_dest at the stand-in; must run before it is imported."""
+    os.environ.update({
+        "GOOGLE_API_KEY": "AIzaBenchmarkKeyBenchmarkKeyBench00",
+        "GOOGLE_MAPS_BASE_URL": places_url,
+        "PLACES_CACHE_BACKEND": "memory",
+        "PLACES_CACHE_TTL": "0",
+        "PLACES_CACHE_STALE_TTL": "0",
+        "PLACES_MAX_PAGES": "1",
+        "PLACES_MAX_WORKERS": str(args.workers),
+        "PLACES_QPS": "10000",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+async def timed_fetch(fetch_attractions, destination: str) -> tuple[float, int]:
+    started = time.perf_counter()
+    results = await fetch_attractions(destination)
+    return time.perf_counter() - started, len(results)
+
+
+async def measure(fetch_attractions, level: int, latency: float, run: int) -> dict:
+    destinations = [f"Benchmark City {run}-{i}" for i in range(level)]
+    started = time.perf_counter()
+    calls = await asyncio.gather(*(timed_fetch(fetch_attractions, d) for d in destinations))
+    wall = time.perf_counter() - started
+    serial = level * latency
+    return {
+        "wall_ms": round(wall * 1000, 2),
+        "serial_ms": round(serial * 1000, 2),
+        # ~N when the calls fully overlap, ~1 when they serialize.
+        "overlap": round(serial / wall, 2) if wall else 0.0,
+        "call_ms": summarize([seconds * 1000 for seconds, _ in calls]),
+        "results": min(count for _, count in calls),
+    }
+
+
+async def main(args) -> dict:
+    server = BackgroundServer(fake_places_app(args.latency)).start()
+    try:
+        configure(server.url, args)
+        from Research_dest import fetch_attractions
+
+        await fetch_attractions("Benchmark Warmup")  # connection setup isn't part of the numbers
+        levels = [int(level) for level in args.levels.split(",")]
+        return {
+            "latency_ms": args.latency * 1000,
+            "workers": args.workers,
+            "levels": {
+                str(level): await measure(fetch_attractions, level, args.latency, run)
+                for run, level in enumerate(levels)
+            },
+        }
+    finally:
+        server.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,2,4,8", help="concurrent lookups per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="stand-in Places latency (s)")
+    parser.add_argument("--workers", type=int, default=8, help="PLACES_MAX_WORKERS")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    print(json.dumps(report, indent=2))
+    for level, result in report["levels"].items():
+        print(f"  N={level:<4} wall {result['wall_ms']:>9.1f} ms  serial {result['serial_ms']:>9.1f} ms  overlap x{result['overlap']}")
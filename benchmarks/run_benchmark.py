@@ -0,0 +1,319 @@
+"""
+Offline load benchmark for /plan-trip.
+
+Starts the local stand-ins (LLM, Places, Airbnb), launches the API under
+uvicorn pointed at them, drives the endpoint at a fixed concurrency and writes
+a JSON report with latency percentiles, throughput and per-stage breakdowns
+(taken from the API's Server-Timing headers).
+
+    python benchmarks/run_benchmark.py --requests 40 --concurrency 8 --output bench.json
+    python benchmarks/run_benchmark.py --env BUDGET_ENGINE_ENABLED=0 --compare bench.json
+
+`--env KEY=VALUE` is passed to the API process, so two runs that differ only
+in one setting can be compared with `--compare`.
+
+`--scenario scaling` instead runs the workload once per concurrency level
+(a fresh API each time, Places cache off so every request calls the Places
+stand-in) and reports how throughput grows with concurrency. If the Places
+or LLM calls blocked the event loop, it would stay flat:
+
+    python benchmarks/run_benchmark.py --scenario scaling --levels 1,2,4,8 --places-latency 1
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+from standins import BackgroundServer, fake_airbnb_app, fake_llm_app, fake_places_app, free_port
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_QUERIES = [
+    "Plan a standard trip to Lisbon from {d1} to {d2} for 2 guests, budget $1500-$2500",
+    "Luxury stay in Rome from {d1} to {d2} for 4 people with a budget between 3000 and 6000 dollars",
+    "Economy trip to Porto {d1} to {d2}, 1 guest, budget 400-900",
+    "I want to go somewhere warm next month with my partner, around two grand",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "mean": round(statistics.fmean(values), 2) if values else 0.0,
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """`llm-classify_0;dur=12.3, agent-X_1;dur=...` -> total ms per step."""
+    stages: dict[str, float] = {}
+    for entry in filter(None, (e.strip() for e in header.split(","))):
+        name, _, params = entry.partition(";")
+        match = re.search(r"dur=([\d.]+)", params)
+        if match:
+            step = re.sub(r"_\d+$", "", name)
+            stages[step] = stages.get(step, 0.0) + float(match.group(1))
+    return stages
+
+
+def bench_trip() -> dict:
+    """The trip the fake LLM extracts from queries the fast path can't parse."""
+    check_in = date.today() + timedelta(days=30)
+    return {
+        "destination": "Lisbon",
+        "check_in": check_in.isoformat(),
+        "check_out": (check_in + timedelta(days=4)).isoformat(),
+        "guests": 2,
+        "min_budget": 1500,
+        "max_budget": 2500,
+        "standard": "standard",
+    }
+
+
+def load_queries(path: str | None) -> list[str]:
+    if path:
+        return json.loads(Path(path).read_text())
+    d1 = date.today() + timedelta(days=30)
+    d2 = d1 + timedelta(days=4)
+    fmt = lambda d: d.strftime("%B %d, %Y")
+    return [q.format(d1=fmt(d1), d2=fmt(d2)) for q in DEFAULT_QUERIES]
+
+
+def start_api(port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "agent_api:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env},
+    )
+
+
+async def wait_until_healthy(url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"API exited with code {process.returncode}")
+            try:
+                if (await client.get(f"{url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API did not become healthy")
+
+
+async def drive(url: str, endpoint: str, queries: list[str], total: int, concurrency: int, timeout: float) -> tuple[list[dict], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(client: httpx.AsyncClient, i: int):
+        async with semaphore:
+            query = queries[i % len(queries)]
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{url}{endpoint}", json={"query": query})
+                status = response.status_code
+                timing = response.headers.get("server-timing", "")
+            except httpx.HTTPError as e:
+                status, timing = f"error:{type(e).__name__}", ""
+            results.append({
+                "query": query,
+                "status": status,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "stages": parse_server_timing(timing),
+            })
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def build_report(args, results: list[dict], elapsed: float, app_env: dict, concurrency: int) -> dict:
+    ok = [r for r in results if r["status"] == 200]
+    statuses: dict[str, int] = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+
+    stage_values: dict[str, list[float]] = {}
+    for r in ok:
+        for stage, ms in r["stages"].items():
+            stage_values.setdefault(stage, []).append(ms)
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": concurrency,
+            "endpoint": args.endpoint,
+            "llm": {"latency": args.llm_latency, "tokens_per_second": args.llm_tokens_per_second,
+                    "completion_tokens": args.llm_completion_tokens},
+            "places_latency": args.places_latency,
+            "airbnb": {"latency": args.airbnb_latency, "html_dir": args.airbnb_html_dir},
+            "app_env": {k: v for k, v in app_env.items() if k in args.env_keys},
+        },
+        "summary": {
+            "requests": len(results),
+            "succeeded": len(ok),
+            "statuses": statuses,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+            "latency_ms": summarize([r["latency_ms"] for r in ok]),
+        },
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stage_values.items())},
+    }
+
+
+def print_comparison(report: dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+
+    def line(label: str, new: float, old: float):
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"  {label:<40} {old:>10.1f} -> {new:>10.1f}  {change}")
+
+    print(f"Compared with {baseline_path}:")
+    for pct in ("p50", "p95", "p99"):
+        line(f"latency {pct} (ms)", report["summary"]["latency_ms"][pct], baseline["summary"]["latency_ms"][pct])
+    line("throughput (req/s)", report["summary"]["throughput_rps"], baseline["summary"]["throughput_rps"])
+    for stage, stats in report["stages_ms"].items():
+        if stage in baseline.get("stages_ms", {}):
+            line(f"{stage} p50 (ms)", stats["p50"], baseline["stages_ms"][stage]["p50"])
+
+
+async def main(args, concurrency: int | None = None, env: dict | None = None) -> dict:
+    concurrency = concurrency or args.concurrency
+    queries = load_queries(args.queries)
+    llm = BackgroundServer(fake_llm_app(
+        bench_trip(), args.llm_latency, args.llm_tokens_per_second, args.llm_completion_tokens
+    )).start()
+    places = BackgroundServer(fake_places_app(args.places_latency)).start()
+    airbnb = BackgroundServer(fake_airbnb_app(args.airbnb_latency, html_dir=args.airbnb_html_dir)).start()
+
+    overrides = dict(item.split("=", 1) for item in args.env)
+    args.env_keys = set(overrides)
+    app_env = {
+        "GROQ_API_KEY": "bench",
+        "GROQ_BASE_URL": llm.url,                      # groq SDK
+        "GROQ_API_BASE": f"{llm.url}/openai/v1",       # LiteLLM
+        "MODEL": "groq/bench-model",
+        "GOOGLE_API_KEY": "AIzaBenchmarkKeyBenchmarkKeyBench00",
+        "GOOGLE_MAPS_BASE_URL": places.url,
+        "AIRBNB_BASE_URL": airbnb.url,
+        # Fresh, in-process caches so every run starts cold.
+        "PLACES_CACHE_BACKEND": "memory",
+        "LISTING_CACHE_BACKEND": "memory",
+        "SERVER_TIMING_ENABLED": "1",
+        "LOG_LEVEL": "WARNING",
+        **(env or {}),
+        **overrides,
+    }
+
+    port = args.api_port or free_port()
+    url = f"http://127.0.0.1:{port}"
+    api = start_api(port, app_env)
+    try:
+        await wait_until_healthy(url, api)
+        if args.warmup:
+            await drive(url, args.endpoint, queries, args.warmup, 1, args.timeout)
+        results, elapsed = await drive(url, args.endpoint, queries, args.requests, concurrency, args.timeout)
+    finally:
+        api.terminate()
+        try:
+            api.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            api.kill()
+        for server in (llm, places, airbnb):
+            server.stop()
+
+    return build_report(args, results, elapsed, app_env, concurrency)
+
+
+# Every request makes its own Places call (concurrent identical ones still
+# share one through single-flight), so the Places path is what scales.
+SCALING_ENV = {"PLACES_CACHE_TTL": "0", "PLACES_CACHE_STALE_TTL": "0"}
+
+
+async def run_scaling(args) -> dict:
+    """`main` once per concurrency level, with `--requests` requests per unit of concurrency."""
+    requests_per_level = args.requests
+    levels = {}
+    for level in (int(l) for l in args.levels.split(",")):
+        args.requests = requests_per_level * level
+        report = await main(args, concurrency=level, env=SCALING_ENV)
+        levels[level] = report
+    args.requests = requests_per_level
+
+    base = levels[min(levels)]["summary"]["throughput_rps"]
+    base_level = min(levels)
+    return {
+        "scenario": "scaling",
+        "levels": {
+            str(level): {
+                "throughput_rps": report["summary"]["throughput_rps"],
+                "latency_ms": report["summary"]["latency_ms"],
+                # 1.0 means throughput grew in proportion to concurrency.
+                "scaling_efficiency": round(report["summary"]["throughput_rps"] / (base * level / base_level), 3) if base else 0.0,
+                "places_ms": report["stages_ms"].get("places-text_search"),
+                "succeeded": report["summary"]["succeeded"],
+            }
+            for level, report in levels.items()
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=("fixed", "scaling"), default="fixed")
+    parser.add_argument("--levels", default="1,2,4,8", help="concurrency levels for --scenario scaling")
+    parser.add_argument("--requests", type=int, default=20, help="requests (per unit of concurrency with --scenario scaling)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=1, help="requests sent (sequentially) before measuring")
+    parser.add_argument("--endpoint", default="/plan-trip")
+    parser.add_argument("--queries", help="JSON file with a list of query strings")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--api-port", type=int)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200)
+    parser.add_argument("--llm-completion-tokens", type=int, default=300)
+    parser.add_argument("--places-latency", type=float, default=0.1)
+    parser.add_argument("--airbnb-latency", type=float, default=0.2)
+    parser.add_argument("--airbnb-html-dir", help="directory of saved Airbnb search result pages (*.html)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra API environment")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="earlier JSON report to print deltas against")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(run_scaling(args) if args.scenario == "scaling" else main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare and args.scenario == "fixed":
+        print_comparison(report, args.compare)
@@ -0,0 +1,239 @@
+"""
+Local stand-ins for the services the planning pipeline calls, so benchmark
+runs are offline and reproducible:
+
+- a Groq/OpenAI-compatible chat completions server with configurable latency
+  and output token rate (streaming and non-streaming),
+- a Google Places text search stub,
+- an Airbnb search results server that serves saved HTML pages, or generated
+  pages with the same card markup when none are given.
+"""
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+
+PAGE_SIZE = 18  # matches airbnb_scraper.PAGE_SIZE
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app, port: int | None = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self) -> "BackgroundServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stand-in on port {self.port} did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+# ---------------------------------------------------------------------------
+# LLM
+# ---------------------------------------------------------------------------
+
+def fake_llm_app(trip: dict, latency: float = 0.3, tokens_per_second: float = 200, completion_tokens: int = 300) -> FastAPI:
+    """
+    Answers every `*/chat/completions` request after `latency` seconds plus
+    `completion_tokens / tokens_per_second`. JSON-mode calls get `trip` (wrapped
+    in an intent object when the prompt asks for one), 10-token calls get an
+    intent word, everything else gets filler Markdown.
+    """
+    app = FastAPI()
+
+    def reply_for(body: dict) -> tuple[str, int]:
+        messages = body.get("messages") or []
+        system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens") or completion_tokens
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            payload = {"intent": "trip_planning", "fields": trip} if '"intent"' in system else trip
+            text = json.dumps(payload)
+            return text, len(text) // 4
+        if max_tokens <= 10:
+            return "trip_planning", 1
+        count = min(max_tokens, completion_tokens)
+        words = ["**Day**", "visit", "the", "old", "town,", "then", "lunch", "for", "$25.", "\n-"]
+        return " ".join(words[i % len(words)] for i in range(count)), count
+
+    def completion(body: dict, text: str, tokens: int) -> dict:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "bench-model"),
+            "service_tier": "on_demand",  # Groq always sends it and LiteLLM's Groq adapter reads it
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(json.dumps(body.get("messages", []))) // 4, "completion_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def chunk(body: dict, chunk_id: str, delta: dict, finish_reason=None) -> str:
+        data = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "bench-model"),
+            "service_tier": "on_demand",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    @app.post("/{path:path}")
+    async def chat_completions(path: str, request: Request):
+        if not path.endswith("chat/completions"):
+            return JSONResponse({"error": {"message": f"Unknown path /{path}"}}, status_code=404)
+        body = await request.json()
+        text, tokens = reply_for(body)
+        await asyncio.sleep(latency)
+
+        if not body.get("stream"):
+            await asyncio.sleep(tokens / tokens_per_second)
+            return completion(body, text, tokens)
+
+        async def events():
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+            yield chunk(body, chunk_id, {"role": "assistant", "content": ""})
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                await asyncio.sleep(1 / tokens_per_second)
+                yield chunk(body, chunk_id, {"content": word if i == 0 else " " + word})
+            yield chunk(body, chunk_id, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+# ---------------------------------------------------------------------------
+# Google Places
+# ---------------------------------------------------------------------------
+
+def fake_places_app(latency: float = 0.1, results: int = 20, seed: int = 7) -> FastAPI:
+    """Text search stub returning `results` deterministic attractions for any query."""
+    app = FastAPI()
+
+    @app.get("/maps/api/place/textsearch/json")
+    async def text_search(query: str = "", pagetoken: str | None = None):
+        await asyncio.sleep(latency)
+        rng = random.Random(f"{seed}:{query}:{pagetoken}")
+        place_types = ["museum", "park", "church", "art_gallery", "zoo", "aquarium", "amusement_park"]
+        return {
+            "status": "OK",
+            "results": [
+                {
+                    "place_id": f"place-{i}-{zlib.crc32(query.encode()) % 10_000}",
+                    "name": f"Attraction {i + 1}",
+                    "formatted_address": f"{i + 1} Main Street",
+                    "rating": round(rng.uniform(3.8, 4.9), 1),
+                    "user_ratings_total": rng.randint(20, 20_000),
+                    "price_level": rng.choice([None, 0, 1, 2, 3, 4]),
+                    "types": [rng.choice(place_types), "tourist_attraction", "point_of_interest"],
+                }
+                for i in range(results)
+            ],
+        }
+
+    return app
+
+
+# ---------------------------------------------------------------------------
+# Airbnb
+# ---------------------------------------------------------------------------
+
+def _listing_card(index: int, rng: random.Random, location: str) -> str:
+    price = rng.randint(40, 600)
+    rating = round(rng.uniform(4.0, 5.0), 2)
+    reviews = rng.randint(0, 900)
+    return (
+        '<div itemprop="itemListElement">'
+        f'<a href="/rooms/{100000 + index}?check_in=bench"><img src="/im/{100000 + index}.jpg" width="300" height="200"></a>'
+        f'<div>Apartment in {location} Centre</div>'
+        f'<div data-testid="listing-card-title">Bench stay {index + 1}</div>'
+        f'<div>Cosy flat {index + 1}</div>'
+        f'<div><span>${price} night</span></div>'
+        f'<span>{rating} ({reviews})</span>'
+        '</div>'
+    )
+
+
+_PAGE_HEAD = (
+    "<head><style>@font-face { font-family: Cereal; src: url('/fonts/cereal.woff2') format('woff2'); }"
+    " body { font-family: Cereal, sans-serif; }</style></head>"
+)
+
+
+def fake_airbnb_app(
+    latency: float = 0.2,
+    total_listings: int = 90,
+    html_dir: str | None = None,
+    seed: int = 7,
+    image_kb: int = 40,
+    asset_latency: float = 0.02,
+) -> FastAPI:
+    """
+    Serves `/s/{location}/homes` result pages. With `html_dir`, its saved
+    `*.html` search pages are served in name order by page index; otherwise
+    pages of generated cards are built from `items_offset`. Generated cards
+    carry an `image_kb` photo and the page a web font, so the scraper's load
+    profiles differ the way they do on the real site.
+    """
+    app = FastAPI()
+    saved = sorted(Path(html_dir).glob("*.html")) if html_dir else []
+
+    @app.get("/s/{location}/homes", response_class=HTMLResponse)
+    async def search(location: str, items_offset: int = 0):
+        await asyncio.sleep(latency)
+        page_index = items_offset // PAGE_SIZE
+        if saved:
+            if page_index >= len(saved):
+                return "<html><body>No results</body></html>"
+            return saved[page_index].read_text(encoding="utf-8")
+
+        rng = random.Random(f"{seed}:{location}:{items_offset}")
+        cards = "".join(
+            _listing_card(i, rng, location)
+            for i in range(items_offset, min(items_offset + PAGE_SIZE, total_listings))
+        )
+        return f"<html>{_PAGE_HEAD}<body><main>{cards}</main></body></html>"
+
+    @app.get("/im/{name}")
+    async def image(name: str):
+        await asyncio.sleep(asset_latency)
+        return Response(b"\xff" * (image_kb * 1024), media_type="image/jpeg")
+
+    @app.get("/fonts/{name}")
+    async def font(name: str):
+        await asyncio.sleep(asset_latency)
+        return Response(b"\0" * (60 * 1024), media_type="font/woff2")
+
+    @app.get("/rooms/{room_id}", response_class=HTMLResponse)
+    async def room(room_id: str):
+        return f"<html><body>Room {room_id}</body></html>"
+
+    return app
@@ -0,0 +1,144 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+from observability import get_logger
+
+log = get_logger("browser_pool")
+
+
+class _PooledBrowser:
+    """Bookkeeping for one Chromium process owned by the pool."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.active = 0       # contexts currently checked out
+        self.pages = 0        # pages opened over the browser's lifetime
+        self.retired = False  # no new contexts; closed once idle
+
+    def is_healthy(self, max_pages: int) -> bool:
+        return not self.retired and self.browser.is_connected() and self.pages < max_pages
+
+
+class BrowserPool:
+    """
+    Process-wide pool of headless Chromium browsers.
+
+    Browsers are launched once (at app startup) and shared by every scrape. Each
+    caller gets its own isolated `BrowserContext`, so cookies and storage never
+    leak between requests. The number of concurrently open contexts is capped,
+    and a browser is recycled after serving `max_pages` pages or as soon as it
+    disconnects (crash / OOM kill).
+
+    Usage:
+        async with browser_pool.context() as context:
+            page = await context.new_page()
+            ...
+    """
+
+    def __init__(self, size: int = 1, max_contexts: int = 4, max_pages: int = 100, headless: bool = True):
+        self.size = max(1, size)
+        self.max_contexts = max(1, max_contexts)
+        self.max_pages = max(1, max_pages)
+        self.headless = headless
+
+        self._playwright: Playwright | None = None
+        self._browsers: list[_PooledBrowser] = []
+        self._semaphore = asyncio.Semaphore(self.max_contexts)
+        self._lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self):
+        """Start Playwright and pre-warm `size` browsers. Safe to call more than once."""
+        async with self._lock:
+            if self._playwright is not None and len(self._browsers) >= self.size:
+                return
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            while len(self._browsers) < self.size:
+                self._browsers.append(await self._launch())
+        log.info("Started with %d browser(s), max %d concurrent contexts", len(self._browsers), self.max_contexts)
+
+    async def stop(self):
+        """Close every browser and stop Playwright."""
+        async with self._lock:
+            browsers, self._browsers = self._browsers, []
+            for pooled in browsers:
+                await self._close(pooled)
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+        log.info("Stopped")
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """Check out an isolated `BrowserContext`; it is closed when the block exits."""
+        if not self.started or not self._browsers:
+            # Also covers a warm-up that started Playwright but failed to launch a browser.
+            await self.start()
+
+        async with self._semaphore:
+            pooled = await self._checkout()
+            context: BrowserContext | None = None
+            try:
+                context = await pooled.browser.new_context(**context_options)
+                context.on("page", lambda _page: self._count_page(pooled))
+                yield context
+            finally:
+                if context is not None and pooled.browser.is_connected():
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        log.warning("Error closing context: %s", e)
+                await self._checkin(pooled)
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=self.headless)
+        return _PooledBrowser(browser)
+
+    async def _close(self, pooled: _PooledBrowser):
+        try:
+            if pooled.browser.is_connected():
+                await pooled.browser.close()
+        except Exception as e:
+            log.warning("Error closing browser: %s", e)
+
+    def _count_page(self, pooled: _PooledBrowser):
+        pooled.pages += 1
+        if pooled.pages >= self.max_pages:
+            pooled.retired = True
+
+    async def _checkout(self) -> _PooledBrowser:
+        async with self._lock:
+            if self._playwright is None:
+                raise RuntimeError("Browser pool has been stopped")
+            for i, pooled in enumerate(self._browsers):
+                if not pooled.is_healthy(self.max_pages):
+                    reason = "disconnected" if not pooled.browser.is_connected() else f"served {pooled.pages} pages"
+                    log.info("Recycling browser (%s)", reason)
+                    pooled.retired = True
+                    if pooled.active == 0:
+                        await self._close(pooled)
+                    self._browsers[i] = await self._launch()
+            pooled = min(self._browsers, key=lambda b: b.active)
+            pooled.active += 1
+            return pooled
+
+    async def _checkin(self, pooled: _PooledBrowser):
+        async with self._lock:
+            pooled.active -= 1
+            if not pooled.browser.is_connected():
+                pooled.retired = True
+            if pooled.retired and pooled.active == 0 and pooled not in self._browsers:
+                await self._close(pooled)
+
+
+browser_pool = BrowserPool(
+    size=int(os.getenv("BROWSER_POOL_SIZE", "1")),
+    max_contexts=int(os.getenv("BROWSER_MAX_CONTEXTS", "4")),
+    max_pages=int(os.getenv("BROWSER_MAX_PAGES", "100")),
+)
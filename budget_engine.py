@@ -0,0 +1,214 @@
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+
+from projection import weighted_rating
+
+# Estimated cost per person of one activity, by Google Places price_level
+# (0 = free ... 4 = very expensive). Unpriced places get the preference's default.
+PRICE_LEVEL_COST = {0: 0.0, 1: 15.0, 2: 35.0, 3: 70.0, 4: 120.0}
+DEFAULT_ACTIVITY_COST = {"economy": 10.0, "standard": 25.0, "luxury": 50.0}
+PREFERENCE_COST_FACTOR = {"economy": 0.8, "standard": 1.0, "luxury": 1.5}
+
+ACTIVITIES_PER_DAY = int(os.getenv("BUDGET_ACTIVITIES_PER_DAY", "2"))
+# Largest share of the max budget the stay may take; 0 lifts the constraint.
+ACCOMMODATION_RATIO = float(os.getenv("BUDGET_ACCOMMODATION_RATIO", "0.6")) or None
+COST_STEP = 5  # knapsack resolution in dollars
+
+
+@dataclass
+class Activity:
+    name: str
+    cost: float   # for the whole group
+    value: float
+
+
+@dataclass
+class DayPlan:
+    day: int
+    date: str
+    activities: list[dict] = field(default_factory=list)
+    accommodation_cost: float = 0.0
+    total: float = 0.0
+
+
+@dataclass
+class BudgetPlan:
+    accommodation: dict
+    nights: int
+    nightly_price: float
+    accommodation_total: float
+    activities_total: float
+    total: float
+    min_budget: float
+    max_budget: float
+    remaining: float
+    within_budget: bool
+    meets_minimum: bool
+    days: list[DayPlan]
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def estimate_activities(places: list[dict], guests: int, preference: str) -> list[Activity]:
+    """Turn projected Places results into priced activities for the whole group."""
+    factor = PREFERENCE_COST_FACTOR.get(preference, 1.0)
+    activities = []
+    for place in places:
+        level = place.get("price_level")
+        per_person = PRICE_LEVEL_COST.get(level, DEFAULT_ACTIVITY_COST.get(preference, 25.0))
+        activities.append(Activity(
+            name=place["name"],
+            cost=round(per_person * factor * guests, 2),
+            value=weighted_rating(place.get("rating"), place.get("reviews")),
+        ))
+    return activities
+
+
+def _listing_value(listing: dict, max_nightly: float, preference: str) -> float:
+    """Rating-led score, nudged towards cheaper stays for economy and pricier ones for luxury."""
+    value = weighted_rating(listing.get("rating"), listing.get("reviews"))
+    price_share = listing["nightly_price"] / max_nightly if max_nightly > 0 else 0.0
+    if preference == "economy":
+        value -= price_share
+    elif preference == "luxury":
+        value += 0.5 * price_share
+    return value
+
+
+def _weight(activity: Activity) -> int:
+    return math.ceil(activity.cost / COST_STEP)
+
+
+def _best_activity_sets(activities: list[Activity], max_count: int, capacity: int):
+    """
+    0/1 knapsack with a cardinality limit, solved once for every budget.
+    Returns `(best, keep)`: `best[c]` is the best value of at most `max_count`
+    activities costing at most `c * COST_STEP`, and `keep[i]` is a bytearray
+    marking the (count, capacity) cells where activity i was taken (walked
+    back by `_pick`). When `max_count` covers every activity the count can't
+    bind, so only one row is kept.
+    """
+    limited = max_count < len(activities)
+    rows = max_count if limited else 1
+    width = capacity + 1
+    table = [[0.0] * width for _ in range(rows + 1)]
+    keep = []
+    for activity in activities:
+        weight = _weight(activity)
+        taken = bytearray((rows + 1) * width)
+        for k in range(rows, 0, -1):
+            # Without a count limit the row is updated in place (classic 1-D knapsack).
+            row, prev = table[k], table[k - 1] if limited else table[k]
+            offset = k * width
+            for c in range(capacity, weight - 1, -1):
+                candidate = prev[c - weight] + activity.value
+                if candidate > row[c]:
+                    row[c] = candidate
+                    taken[offset + c] = 1
+        keep.append(taken)
+    return table[rows], keep
+
+
+def _pick(activities: list[Activity], keep, max_count: int, budget_steps: int) -> list[Activity]:
+    limited = max_count < len(activities)
+    width = len(keep[0]) // ((max_count if limited else 1) + 1) if keep else 0
+    chosen = []
+    k, c = (max_count if limited else 1), budget_steps
+    for i in range(len(activities) - 1, -1, -1):
+        if k > 0 and c >= 0 and keep[i][k * width + c]:
+            chosen.append(activities[i])
+            c -= _weight(activities[i])
+            if limited:
+                k -= 1
+    return chosen[::-1]
+
+
+def optimize_budget(
+    listings: list[dict],
+    places: list[dict],
+    guests: int,
+    nights: int,
+    check_in: str,
+    min_budget: float,
+    max_budget: float,
+    preference: str,
+    accommodation_ratio: float | None = ACCOMMODATION_RATIO,
+) -> BudgetPlan | None:
+    """
+    Pick one listing and a set of activities that maximise rating-based value
+    while the total stays within `max_budget`. With `accommodation_ratio`, the
+    stay may use at most that share of `max_budget` (the 0.6 heuristic used for
+    the scrape's price cap). Returns None if no listing fits.
+
+    `listings` and `places` are the projected forms from `projection.py`.
+    """
+    priced = [l for l in listings if l.get("nightly_price")]
+    if not priced or nights <= 0:
+        return None
+
+    accommodation_cap = max_budget * accommodation_ratio if accommodation_ratio else max_budget
+    candidates = [l for l in priced if l["nightly_price"] * nights <= accommodation_cap]
+    if not candidates:
+        return None
+
+    days = max(1, nights)
+    max_count = ACTIVITIES_PER_DAY * days
+    activities = sorted(estimate_activities(places, guests, preference), key=lambda a: -a.value)
+    activities = activities[: max_count * 2]  # plenty to choose from, keeps the table small
+    # No budget step beyond the cost of every activity can change the answer.
+    capacity = max(0, min(int(max_budget // COST_STEP), sum(_weight(a) for a in activities)))
+    best_values, keep = _best_activity_sets(activities, max_count, capacity)
+
+    max_nightly = accommodation_cap / nights
+    best = None
+    for listing in candidates:
+        stay = listing["nightly_price"] * nights
+        steps = int((max_budget - stay) // COST_STEP)
+        if steps < 0:
+            continue
+        steps = min(steps, capacity)
+        # The stay counts once per day, like the activities filling that day.
+        score = days * _listing_value(listing, max_nightly, preference) + best_values[steps]
+        if best is None or score > best[0]:
+            best = (score, listing, steps)
+    if best is None:
+        return None
+
+    _, listing, steps = best
+    chosen = _pick(activities, keep, max_count, steps)
+    return _build_plan(listing, chosen, nights, days, check_in, min_budget, max_budget)
+
+
+def _build_plan(listing, chosen, nights, days, check_in, min_budget, max_budget) -> BudgetPlan:
+    nightly = listing["nightly_price"]
+    start = date.fromisoformat(check_in)
+    plan_days = [
+        DayPlan(day=i + 1, date=(start + timedelta(days=i)).isoformat(), accommodation_cost=nightly)
+        for i in range(days)
+    ]
+    # Best activities first, spread evenly across days.
+    for i, activity in enumerate(chosen):
+        plan_days[i % days].activities.append({"name": activity.name, "cost": activity.cost})
+    for day in plan_days:
+        day.total = round(day.accommodation_cost + sum(a["cost"] for a in day.activities), 2)
+
+    accommodation_total = round(nightly * nights, 2)
+    activities_total = round(sum(a.cost for a in chosen), 2)
+    total = round(accommodation_total + activities_total, 2)
+    return BudgetPlan(
+        accommodation=listing,
+        nights=nights,
+        nightly_price=nightly,
+        accommodation_total=accommodation_total,
+        activities_total=activities_total,
+        total=total,
+        min_budget=min_budget,
+        max_budget=max_budget,
+        remaining=round(max_budget - total, 2),
+        within_budget=total <= max_budget,
+        meets_minimum=total >= min_budget,
+        days=plan_days,
+    )
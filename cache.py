@@ -0,0 +1,272 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from observability import get_logger
+
+log = get_logger("cache")
+
+
+class MemoryBackend:
+    """In-process LRU store of `key -> (value, stored_at)`."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, tuple[object, float]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[object, float] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value, stored_at: float) -> int:
+        """Store a value and return how many entries were evicted to make room."""
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    On-disk LRU store that survives restarts. Values are stored as JSON, so they
+    must be JSON-serializable. Several caches can share one file through
+    different `namespace`s. Calls do disk I/O, so `TTLCache` makes them
+    from a worker thread.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 1024):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    def get(self, key: str) -> tuple[object, float] | None:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key),
+            )
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value, stored_at: float) -> int:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), stored_at, time.time()),
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache_entries WHERE namespace = ?"
+                " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_entries),
+            )
+            return cursor.rowcount
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return row[0]
+
+
+def make_backend(kind: str, namespace: str, max_entries: int, path: str = ".cache/trailmate.sqlite3"):
+    """Build a backend from config: `kind` is "memory" or "sqlite"."""
+    if kind == "sqlite":
+        return SQLiteBackend(path, namespace, max_entries)
+    if kind == "memory":
+        return MemoryBackend(max_entries)
+    raise ValueError(f"Unknown cache backend '{kind}', expected 'memory' or 'sqlite'")
+
+
+def make_durable_backend(kind: str, namespace: str, max_entries: int, path: str = ".cache/trailmate.sqlite3"):
+    """Like `make_backend`, but falls back to memory if the SQLite file can't be opened (e.g. read-only FS)."""
+    try:
+        return make_backend(kind, namespace, max_entries, path)
+    except (OSError, sqlite3.Error) as e:
+        log.warning("Could not open %s for '%s', using in-memory cache: %s", path, namespace, e)
+        return MemoryBackend(max_entries)
+
+
+class TTLCache:
+    """
+    Async read-through cache with a TTL, LRU eviction (done by the backend) and
+    single-flight loading: concurrent misses on the same key share one call to
+    the loader instead of each running it.
+
+    With `stale_ttl > 0`, entries between `ttl` and `ttl + stale_ttl` old are
+    still served (stale-while-revalidate) while one background load refreshes them.
+
+    Backend calls of a `blocking` backend (SQLite) run in a worker thread so
+    they don't stall the event loop.
+    """
+
+    def __init__(self, name: str, backend, ttl: float, stale_ttl: float = 0, should_cache=None):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.should_cache = should_cache or (lambda value: value is not None)
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.rejected_loads = 0
+        self.load_errors = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def _backend(self, method, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _lookup(self, key: str, accept=None) -> tuple[object, bool] | None:
+        """Return `(value, is_stale)` for a usable entry, dropping expired ones."""
+        entry = await self._backend(self.backend.get, key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            await self._backend(self.backend.delete, key)
+            return None
+        if accept is not None and not accept(value):
+            return None
+        return value, age > self.ttl
+
+    async def get(self, key: str, accept=None):
+        """
+        Return a fresh cached value or None, counting the hit or miss. A value
+        rejected by the optional `accept(value)` predicate counts as a miss.
+        """
+        found = await self._lookup(key, accept)
+        if found is not None and not found[1]:
+            self.hits += 1
+            return found[0]
+        self.misses += 1
+        return None
+
+    async def peek(self, key: str):
+        """Return a fresh cached value or None, without counting a hit or miss."""
+        found = await self._lookup(key)
+        return found[0] if found is not None and not found[1] else None
+
+    def is_loading(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def set(self, key: str, value):
+        if self.should_cache(value):
+            self.evictions += await self._backend(self.backend.set, key, value, time.time())
+
+    async def get_or_load(self, key: str, loader, accept=None):
+        """
+        Return the cached value for `key`, or await `loader()` to produce it.
+        Callers that arrive while a load is running wait for that load; if
+        `accept` rejects what it produced, they load again (joining any load
+        started meanwhile). A caller's own load is returned as is.
+        """
+        while key in self._inflight:
+            self.coalesced += 1
+            value = await asyncio.shield(self._inflight[key])
+            if accept is None or accept(value):
+                return value
+            self.rejected_loads += 1
+
+        found = await self._lookup(key, accept)
+        if found is not None:
+            value, is_stale = found
+            if not is_stale:
+                self.hits += 1
+                return value
+            if self.stale_ttl > 0:
+                self.stale_hits += 1
+                self._start_load(key, loader)
+                return value
+
+        self.misses += 1
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def _start_load(self, key: str, loader) -> asyncio.Future:
+        async def load():
+            value = await loader()
+            try:
+                await self.set(key, value)
+            except Exception as e:
+                log.warning("Could not store '%s' entry: %s", self.name, e)
+            return value
+
+        # Run the load in its own task so one caller's cancellation
+        # doesn't abort the load the other callers are waiting on.
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+
+        def done(task: asyncio.Future):
+            self._inflight.pop(key, None)
+            if not task.cancelled() and task.exception() is not None:
+                self.load_errors += 1
+
+        task.add_done_callback(done)
+        return task
+
+    def stats(self) -> dict:
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "rejected_loads": self.rejected_loads,
+            "load_errors": self.load_errors,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,79 @@
+import asyncio
+import math
+import time
+from contextlib import aclosing, asynccontextmanager
+
+from observability import stage_timeouts
+
+
+class StageTimeout(TimeoutError):
+    """A stage used up its share of the request deadline."""
+
+    def __init__(self, stage: str, seconds: float):
+        super().__init__(f"{stage} ran out of its {seconds:.1f}s budget")
+        self.stage = stage
+        self.seconds = seconds
+
+
+class Deadline:
+    """
+    Time budget for one request. Stages get a `share` of the total, capped by
+    what is left, so a slow early stage can't starve the ones after it of more
+    than their own slice. `seconds <= 0` means no deadline.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds > 0 else math.inf
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, share: float) -> float:
+        """Seconds a stage with this share of the total may run for."""
+        if self.seconds <= 0:
+            return math.inf
+        return min(self.remaining(), share * self.seconds)
+
+    @asynccontextmanager
+    async def stage(self, name: str, share: float):
+        """Cancel the block and raise `StageTimeout` once it runs past its budget."""
+        seconds = self.budget(share)
+        if math.isinf(seconds):
+            yield
+            return
+        scope = asyncio.timeout(seconds)
+        try:
+            async with scope:
+                yield
+        except TimeoutError:
+            if not scope.expired():
+                raise
+            stage_timeouts.inc(stage=name)
+            raise StageTimeout(name, seconds) from None
+
+    async def iterate(self, name: str, items, share: float):
+        """
+        Pass through the async generator `items`, raising `StageTimeout` (and
+        closing it) if the whole iteration runs past its budget. The timeout
+        only covers waiting for the next item, so it never fires inside the
+        caller's code between items.
+        """
+        seconds = self.budget(share)
+        expires_at = time.monotonic() + seconds
+        async with aclosing(items):
+            while True:
+                timeout = None if math.isinf(seconds) else max(0.0, expires_at - time.monotonic())
+                try:
+                    item = await asyncio.wait_for(anext(items), timeout)
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    if time.monotonic() < expires_at:
+                        raise
+                    stage_timeouts.inc(stage=name)
+                    raise StageTimeout(name, seconds) from None
+                yield item
+
+
+NO_DEADLINE = Deadline(0)
@@ -0,0 +1,189 @@
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """
+    A governed resource is saturated: its wait queue is full, or a slot would
+    not free up within the deadline. The API turns this into a 503 with
+    `Retry-After: retry_after`.
+    """
+
+    def __init__(self, resource: str, retry_after: float, reason: str):
+        super().__init__(f"{resource} is overloaded ({reason})")
+        self.resource = resource
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class _LimiterStats:
+    def __init__(self):
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds: float):
+        self.admitted += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_seconds": round(self.wait_seconds / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 4),
+        }
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` holders at once. Up to `max_waiting` callers queue for a
+    slot, each for at most `timeout` seconds; anyone beyond that is rejected
+    at once with `Overloaded`. `limit <= 0` disables the limiter.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max(0, max_waiting)
+        self.timeout = timeout
+        self.in_use = 0
+        self._semaphore = asyncio.Semaphore(max(1, limit))
+        self._stats = _LimiterStats()
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.limit <= 0:
+            yield
+            return
+
+        if self.in_use + self._stats.waiting >= self.limit + self.max_waiting:
+            self._stats.rejected += 1
+            raise Overloaded(self.name, self.timeout, f"{self._stats.waiting} waiting")
+
+        started = time.perf_counter()
+        self._stats.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._stats.timed_out += 1
+            raise Overloaded(self.name, self.timeout, f"no slot within {self.timeout}s") from None
+        finally:
+            self._stats.waiting -= 1
+        self._stats.record_wait(time.perf_counter() - started)
+
+        self.in_use += 1
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_use": self.in_use, **self._stats.stats()}
+
+
+class TokenBucket:
+    """
+    Rate limit of `rate` units per second with bursts up to `capacity`.
+
+    `acquire(amount)` reserves the units and sleeps until they are earned.
+    If that would take longer than `timeout`, or `max_waiting` callers are
+    already sleeping, it raises `Overloaded` without reserving anything.
+    `rate <= 0` disables the bucket.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, max_waiting: int, timeout: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.max_waiting = max(0, max_waiting)
+        self.timeout = timeout
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._stats = _LimiterStats()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1):
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)  # a single huge request still gets through, once
+        self._refill()
+        wait = max(0.0, (amount - self._tokens) / self.rate)
+        if wait > 0 and self._stats.waiting >= self.max_waiting:
+            self._stats.rejected += 1
+            raise Overloaded(self.name, wait, f"{self._stats.waiting} waiting")
+        if wait > self.timeout:
+            self._stats.timed_out += 1
+            raise Overloaded(self.name, wait, f"needs {wait:.1f}s to refill")
+
+        # Reserve now (possibly going negative) so later callers queue behind us.
+        self._tokens -= amount
+        self._stats.record_wait(wait)
+        if wait > 0:
+            self._stats.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._stats.waiting -= 1
+
+    def stats(self) -> dict:
+        self._refill()
+        return {"rate_per_second": self.rate, "available": round(max(0.0, self._tokens), 2), **self._stats.stats()}
+
+
+class ResourceGovernor:
+    """
+    Process-wide limits on everything a traffic spike fans out into:
+    concurrent plan requests, concurrent LLM calls, LLM tokens per minute,
+    Places queries per second, and open browser pages.
+    """
+
+    def __init__(self):
+        timeout = float(os.getenv("GOVERNOR_QUEUE_TIMEOUT", "20"))
+        max_waiting = int(os.getenv("GOVERNOR_MAX_WAITING", "50"))
+        llm_tpm = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+        places_qps = float(os.getenv("PLACES_QPS", "5"))
+
+        self.requests = ConcurrencyLimiter(
+            "plan requests", int(os.getenv("MAX_CONCURRENT_PLANS", "8")), max_waiting, timeout
+        )
+        self.llm_requests = ConcurrencyLimiter(
+            "LLM requests", int(os.getenv("LLM_MAX_CONCURRENCY", "8")), max_waiting, timeout
+        )
+        self.llm_tokens = TokenBucket("LLM tokens", llm_tpm / 60, llm_tpm, max_waiting, timeout)
+        self.places = TokenBucket("Places API", places_qps, max(1.0, places_qps), max_waiting, timeout)
+        self.browser_pages = ConcurrencyLimiter(
+            "browser pages", int(os.getenv("BROWSER_MAX_PAGES_OPEN", "6")), max_waiting, timeout
+        )
+
+    @asynccontextmanager
+    async def llm_call(self, estimated_tokens: int):
+        """Hold an LLM request slot, after reserving `estimated_tokens` of the per-minute budget."""
+        async with self.llm_requests.slot():
+            await self.llm_tokens.acquire(estimated_tokens)
+            yield
+
+    def stats(self) -> dict:
+        return {
+            "plan_requests": self.requests.stats(),
+            "llm_requests": self.llm_requests.stats(),
+            "llm_tokens": self.llm_tokens.stats(),
+            "places": self.places.stats(),
+            "browser_pages": self.browser_pages.stats(),
+        }
+
+
+governor = ResourceGovernor()
@@ -0,0 +1,183 @@
+import asyncio
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+
+from cache import make_durable_backend
+from observability import get_logger
+
+log = get_logger("jobs")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class QueueFullError(Exception):
+    """Raised by `JobQueue.submit` when `max_queued` jobs are already waiting."""
+
+
+@dataclass
+class Job:
+    id: str
+    query: str
+    plan_id: str | None = None  # the plan this query revises, if any
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    # Stage name -> seconds after start at which it finished, in completion order.
+    stages: dict[str, float] = field(default_factory=dict)
+    result: dict = field(default_factory=dict)
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class JobStore:
+    """
+    Job records on top of a cache backend (`MemoryBackend` or `SQLiteBackend`),
+    so jobs get the same LRU bound and, with SQLite, survive restarts. Calls to
+    a `blocking` backend run in a worker thread, as in `TTLCache`.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def _backend(self, method, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get(self, job_id: str) -> Job | None:
+        entry = await self._backend(self.backend.get, job_id)
+        return Job(**entry[0]) if entry is not None else None
+
+    async def put(self, job: Job):
+        # Snapshot on the loop; the job keeps changing while the write runs.
+        await self._backend(self.backend.set, job.id, job.to_dict(), time.time())
+
+
+class JobQueue:
+    """
+    Runs `/plan-trip` pipelines in the background on `concurrency` workers.
+
+    `runner(query, plan_id)` is an async generator of `(stage, output)` pairs; each pair
+    is written to the job as it arrives, so polling shows per-stage progress.
+    At most `max_queued` jobs wait for a worker; beyond that `submit` raises
+    `QueueFullError`.
+    """
+
+    def __init__(self, store: JobStore, runner, concurrency: int = 2, max_queued: int = 100):
+        self.store = store
+        self.runner = runner
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max(1, max_queued)
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._queued: set[str] = set()
+        self._stopping = False
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        log.info("Job queue started with %d worker(s)", self.concurrency)
+
+    async def stop(self):
+        # Jobs interrupted here stay "running" in the store; `get` reports them as failed later.
+        self._stopping = True
+        for task in [*self._workers, *self._running.values()]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._running.values(), return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, query: str, plan_id: str | None = None) -> Job:
+        if len(self._queued) >= self.max_queued:
+            raise QueueFullError(f"{len(self._queued)} jobs are already waiting")
+        job = Job(id=uuid.uuid4().hex, query=query, plan_id=plan_id)
+        self._queued.add(job.id)  # before the write, so concurrent submits see the slot as taken
+        try:
+            await self.store.put(job)
+        except BaseException:
+            self._queued.discard(job.id)
+            raise
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        job = await self.store.get(job_id)
+        if job is not None and job.status not in FINISHED and job.id not in self._queued and job.id not in self._running:
+            # Left unfinished by a previous process (SQLite store).
+            job.status, job.error = FAILED, "Interrupted by a server restart"
+            await self.store.put(job)
+        return job
+
+    async def cancel(self, job_id: str) -> Job | None:
+        """Cancel a queued or running job. Finished jobs are returned unchanged."""
+        job = await self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()  # the worker records the cancellation
+        else:
+            self._queued.discard(job_id)
+            job.status, job.finished_at = CANCELLED, time.time()
+            await self.store.put(job)
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "running": len(self._running),
+            "queued": len(self._queued),
+        }
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                if job_id not in self._queued:
+                    continue  # cancelled while waiting
+                self._queued.discard(job_id)
+                job = await self.store.get(job_id)
+                if job is None:
+                    continue  # evicted from the store
+                task = asyncio.create_task(self._run(job))
+                self._running[job_id] = task
+                try:
+                    await asyncio.gather(task, return_exceptions=True)
+                finally:
+                    self._running.pop(job_id, None)
+                    if task.cancelled() and not self._stopping:
+                        job.status, job.finished_at = CANCELLED, time.time()
+                        await self.store.put(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status, job.started_at = RUNNING, time.time()
+        await self.store.put(job)
+        log.info("Job running", extra={"job_id": job.id})
+        try:
+            async for stage, output in self.runner(job.query, job.plan_id):
+                job.result[stage] = output
+                job.stages[stage] = round(time.time() - job.started_at, 3)
+                await self.store.put(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.status, job.error = FAILED, getattr(e, "detail", None) or str(e)
+            log.warning("Job failed: %s", job.error, extra={"job_id": job.id})
+        else:
+            job.status = SUCCEEDED
+            log.info("Job succeeded", extra={"job_id": job.id})
+        job.finished_at = time.time()
+        await self.store.put(job)
+
+
+def make_job_store(kind: str, max_jobs: int) -> JobStore:
+    """`kind` is "memory" or "sqlite", as for the caches."""
+    return JobStore(make_durable_backend(kind, "jobs", max_jobs))
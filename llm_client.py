@@ -0,0 +1,142 @@
+import asyncio
+import os
+import random
+
+import httpx
+from dotenv import load_dotenv
+from groq import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncGroq,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
+
+from governor import governor
+from observability import get_logger, llm_hedges, llm_retries
+from projection import estimate_tokens
+
+log = get_logger("llm_client")
+
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+# Output tokens assumed for the tokens-per-minute budget when a call sets no limit.
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1024"))
+# Send a second, identical request when the first hasn't answered after this
+# many seconds, and use whichever answers first (0 disables). Short calls
+# (classification, extraction) hedge sooner than agent runs, whose long
+# outputs are slow even when nothing is wrong.
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "4"))
+AGENT_LLM_HEDGE_AFTER = float(os.getenv("AGENT_LLM_HEDGE_AFTER", "0"))
+AGENT_LLM_MAX_RETRIES = int(os.getenv("AGENT_LLM_MAX_RETRIES", "2"))
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+
+_client: AsyncGroq | None = None
+
+
+def get_groq_client() -> AsyncGroq:
+    """
+    Process-wide AsyncGroq client. All Groq calls share its keep-alive
+    connection pool, so requests don't pay a TLS handshake each time.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncGroq(
+            api_key=GROQ_API_KEY,
+            timeout=LLM_TIMEOUT,
+            max_retries=0,  # retries are done by `chat_completion` with jittered backoff
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                    keepalive_expiry=60,
+                ),
+            ),
+        )
+    return _client
+
+
+async def close_groq_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt + 1`."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+async def hedged(call, hedge_after: float):
+    """
+    Await `call()`. If it hasn't finished after `hedge_after` seconds, start a
+    second `call()` and return the first successful result, cancelling the
+    other; if both fail, the last error is raised. `hedge_after <= 0` just
+    awaits `call()`.
+    """
+    if hedge_after <= 0:
+        return await call()
+
+    primary = asyncio.ensure_future(call())
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        hedge_sent = not done
+        if hedge_sent:
+            tasks.add(asyncio.ensure_future(call()))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if hedge_sent:
+                        llm_hedges.inc(winner="primary" if task is primary else "hedge")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def with_retries(call, retryable: tuple, max_retries: int, hedge_after: float, caller: str):
+    """
+    `hedged(call, hedge_after)`, retried up to `max_retries` times on
+    `retryable` errors with jittered backoff.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await hedged(call, hedge_after)
+        except retryable as e:
+            if attempt == max_retries:
+                raise
+            llm_retries.inc(caller=caller)
+            log.warning("Transient LLM error, retrying: %s", e, extra={"caller": caller, "attempt": attempt + 1})
+            await asyncio.sleep(backoff_delay(attempt))
+
+
+async def chat_completion(timeout: float = LLM_TIMEOUT, max_retries: int = LLM_MAX_RETRIES, **kwargs):
+    """
+    `client.chat.completions.create(**kwargs)` on the shared client with a
+    per-call timeout, a hedged second request after LLM_HEDGE_AFTER seconds,
+    and up to `max_retries` retries of transient errors (connection problems,
+    timeouts, 429s and 5xx) with full-jitter exponential backoff. Each request
+    goes through the governor's LLM limits.
+    """
+    tokens = estimate_tokens(str(kwargs.get("messages", ""))) + kwargs.get("max_completion_tokens", LLM_OUTPUT_TOKEN_ESTIMATE)
+
+    async def call():
+        async with governor.llm_call(tokens):
+            return await get_groq_client().chat.completions.create(timeout=timeout, **kwargs)
+
+    return await with_retries(call, RETRYABLE_ERRORS, max_retries, LLM_HEDGE_AFTER, caller="chat_completion")
@@ -0,0 +1,313 @@
+import asyncio
+import contextvars
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+
+# ---------------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------------
+
+# Attributes every LogRecord has; anything else came in through `extra=`.
+_STANDARD_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD_RECORD_ATTRS}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """`time LEVEL logger: message key=value ...` for local development."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+_listener: logging.handlers.QueueListener | None = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging():
+    """
+    Route the `trailmate` loggers through a QueueHandler, so a log call only
+    enqueues the record and a background thread does the formatting and I/O.
+    Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler()
+        stream.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else TextFormatter())
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+        _listener.start()
+
+        root = logging.getLogger("trailmate")
+        root.setLevel(LOG_LEVEL)
+        root.handlers = [logging.handlers.QueueHandler(records)]
+        root.propagate = False
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"trailmate.{name}")
+
+
+# ---------------------------------------------------------------------------
+# Prometheus metrics (text exposition format 0.0.4, no client library)
+# ---------------------------------------------------------------------------
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """
+        `collect()` returns `[(name, help, {labels: value})]` gauges read at
+        scrape time, for state that already lives elsewhere (caches, queues).
+        """
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, help, samples in collect():
+                lines.extend([f"# HELP {name} {help}", f"# TYPE {name} gauge"])
+                for labels, value in samples.items():
+                    lines.append(f"{name}{_format_labels(dict(labels))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "trailmate_stage_duration_seconds",
+    "Duration of pipeline steps: LLM calls, agent runs, tool calls, navigations.",
+    ("kind", "name"),
+))
+http_request_seconds = registry.register(Histogram(
+    "trailmate_http_request_duration_seconds",
+    "HTTP request duration by route and status.",
+    ("method", "route", "status"),
+))
+llm_hedges = registry.register(Counter(
+    "trailmate_llm_hedges_total",
+    "LLM calls that sent a hedged second request, by which request answered first.",
+    ("winner",),
+))
+llm_retries = registry.register(Counter(
+    "trailmate_llm_retries_total",
+    "LLM requests retried after a transient error.",
+    ("caller",),
+))
+stage_timeouts = registry.register(Counter(
+    "trailmate_stage_timeouts_total",
+    "Pipeline stages cut off by their share of the request deadline.",
+    ("stage",),
+))
+scrape_pages = registry.register(Counter(
+    "trailmate_scrape_pages_total",
+    "Airbnb result pages loaded.",
+    ("outcome",),
+))
+scrape_pages_per_second = registry.register(Histogram(
+    "trailmate_scrape_pages_per_second",
+    "Result pages loaded per second of wall time, per scrape.",
+    buckets=(0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10),
+))
+scrape_page_ready_seconds = registry.register(Histogram(
+    "trailmate_scrape_page_ready_seconds",
+    "Airbnb results page navigation start until the first listing card, by load profile.",
+    ("profile",),
+))
+scrape_page_bytes = registry.register(Histogram(
+    "trailmate_scrape_page_bytes",
+    "Bytes transferred per Airbnb results page, by load profile (AIRBNB_MEASURE_PAGES=1).",
+    ("profile",),
+    buckets=(1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2e7, 5e7),
+))
+scrape_page_heap_bytes = registry.register(Histogram(
+    "trailmate_scrape_page_heap_bytes",
+    "JS heap in use once an Airbnb results page is ready, by load profile (AIRBNB_MEASURE_PAGES=1).",
+    ("profile",),
+    buckets=(5e6, 1e7, 2.5e7, 5e7, 1e8, 2.5e8, 5e8),
+))
+scrape_blocked_requests = registry.register(Counter(
+    "trailmate_scrape_blocked_requests_total",
+    "Requests aborted by the light load profile, by resource type or \"tracker\".",
+    ("reason",),
+))
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+# Steps timed during the current HTTP request, for the Server-Timing header.
+# The list is shared with tasks spawned by the request (they copy the context).
+_request_timings: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_timings", default=None)
+
+_timing_log = get_logger("timing")
+
+
+@contextmanager
+def timed(kind: str, name: str, **fields):
+    """
+    Time a block: observe it in `trailmate_stage_duration_seconds`, add it to
+    the request's Server-Timing entries and log it at DEBUG (WARNING if it raised,
+    other than by being cancelled).
+    """
+    started = time.perf_counter()
+    outcome = "finished"
+    try:
+        yield
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except BaseException:
+        outcome = "failed"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        stage_seconds.observe(seconds, kind=kind, name=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((f"{kind}-{name}", seconds))
+        _timing_log.log(
+            logging.WARNING if outcome == "failed" else logging.DEBUG,
+            "%s %s %s in %.3fs", kind, name, outcome, seconds,
+            extra={"kind": kind, "step": name, "seconds": round(seconds, 4), "outcome": outcome, **fields},
+        )
+
+
+def start_request_timings() -> contextvars.Token:
+    return _request_timings.set([])
+
+
+def server_timing_header(token: contextvars.Token) -> str:
+    """Render and reset the timings collected since `start_request_timings()`."""
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    entries = []
+    for i, (name, seconds) in enumerate(timings):
+        # Metric names are tokens; repeated steps get a numeric suffix.
+        token_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        entries.append(f'{token_name}_{i};dur={seconds * 1000:.1f}')
+    return ", ".join(entries)
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+
+from cache import make_durable_backend
+
+
+def fingerprint(*parts) -> str:
+    """Stable digest of a stage's inputs."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class PlanSession:
+    """
+    A trip plan that follow-up queries can revise. Each stage's output is kept
+    with a fingerprint of the inputs it was computed from; a revision reruns a
+    stage only when its fingerprint changes.
+    """
+    id: str
+    request: dict  # AccommodationRequest.model_dump() of the latest revision
+    revision: int = 1
+    updated_at: float = field(default_factory=time.time)
+    # Stage name -> {"fingerprint": str, "output": ...}
+    stages: dict[str, dict] = field(default_factory=dict)
+    # The last listing search: {"key": fingerprint of its search inputs, "max_price": cap, "listings": [...]}
+    listings: dict | None = None
+    # Stages the latest revision took from the previous one.
+    reused_stages: list[str] = field(default_factory=list)
+
+    def revise(self, request: dict) -> list[str]:
+        """Start a new revision for `request` and return the fields that changed."""
+        changed = sorted(k for k in request.keys() | self.request.keys() if request.get(k) != self.request.get(k))
+        self.request = request
+        self.revision += 1
+        self.reused_stages = []
+        return changed
+
+    def reusable(self, stage: str, stage_fingerprint: str):
+        """The stage's stored output if it was computed from the same inputs, else None."""
+        previous = self.stages.get(stage)
+        if previous is None or previous["fingerprint"] != stage_fingerprint:
+            return None
+        self.reused_stages.append(stage)
+        return previous["output"]
+
+    def record(self, stage: str, stage_fingerprint: str, output):
+        self.stages[stage] = {"fingerprint": stage_fingerprint, "output": output}
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class PlanStore:
+    """
+    Plan sessions on top of a cache backend, like `JobStore`, including
+    running a `blocking` backend's calls in a worker thread. Sessions not
+    revised for `ttl` seconds expire.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def _backend(self, method, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def create(self, request: dict) -> PlanSession:
+        return PlanSession(id=uuid.uuid4().hex, request=request)
+
+    async def get(self, plan_id: str) -> PlanSession | None:
+        entry = await self._backend(self.backend.get, plan_id)
+        if entry is None:
+            return None
+        data, stored_at = entry
+        if time.time() - stored_at > self.ttl:
+            await self._backend(self.backend.delete, plan_id)
+            return None
+        return PlanSession(**data)
+
+    async def put(self, session: PlanSession):
+        session.updated_at = time.time()
+        # Snapshot on the loop; serializing and writing it happen in the thread.
+        await self._backend(self.backend.set, session.id, session.to_dict(), session.updated_at)
+
+    def stats(self) -> dict:
+        return {"sessions": len(self.backend)}
+
+
+def make_plan_store(kind: str, max_sessions: int, ttl: float) -> PlanStore:
+    """`kind` is "memory" or "sqlite", as for the caches."""
+    return PlanStore(make_durable_backend(kind, "plans", max_sessions), ttl)
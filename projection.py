@@ -0,0 +1,150 @@
+import json
+import math
+import os
+import re
+
+# Rough budget sizes, in tokens, for what we hand to the LLM.
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "1500"))
+AGENT_OUTPUT_TOKEN_BUDGET = int(os.getenv("AGENT_OUTPUT_TOKEN_BUDGET", "1200"))
+
+CHARS_PER_TOKEN = 4  # good enough for English/JSON with Llama-style tokenizers
+
+# Google Places types that say nothing about what a place is.
+_GENERIC_PLACE_TYPES = {"point_of_interest", "establishment", "tourist_attraction"}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def parse_nightly_price(price: str, nights: int) -> float | None:
+    """
+    Parse a card price string ("$152 night", "$180 $152 night", "$760 total",
+    "$760 for 5 nights") into a nightly rate. Returns None if no amount is found.
+    """
+    amounts = re.findall(r"\$\s?([\d,]+(?:\.\d+)?)", price or "")
+    if not amounts:
+        return None
+    # The last amount is the one charged (earlier ones are struck-through prices).
+    amount = float(amounts[-1].replace(",", ""))
+    if nights > 1 and re.search(r"total|for \d+ nights", price, re.IGNORECASE):
+        amount /= nights
+    return round(amount, 2)
+
+
+def to_float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_int(value) -> int | None:
+    try:
+        return int(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def weighted_rating(rating: float | None, reviews: int | None, prior: float = 4.5, weight: int = 10) -> float:
+    """Bayesian average, so a 5.0 from 2 reviews doesn't outrank a 4.9 from 400."""
+    if rating is None:
+        return prior - 0.5
+    reviews = reviews or 0
+    return (rating * reviews + prior * weight) / (reviews + weight)
+
+
+def _drop_empty(item: dict) -> dict:
+    return {k: v for k, v in item.items() if v not in (None, "", "N/A", "Unknown", [])}
+
+
+def fit_to_budget(items: list[dict], token_budget: int) -> list[dict]:
+    """Keep the longest prefix of `items` whose compact JSON fits `token_budget`."""
+    kept = []
+    used = 2  # the enclosing brackets
+    for item in items:
+        cost = estimate_tokens(compact_json(item)) + 1
+        if used + cost > token_budget:
+            break
+        kept.append(item)
+        used += cost
+    return kept
+
+
+def listing_key(listing: dict) -> str:
+    """
+    Identity of a scraped listing for de-duplication: its URL without the
+    query string (the same room shows up with different ones on different
+    pages), or for a card without a link, its title, subtitle and price.
+    """
+    url = listing.get("url") or "N/A"
+    if url != "N/A":
+        return url.split("?")[0]
+    return json.dumps([listing.get("title"), listing.get("subtitle"), listing.get("price")])
+
+
+def project_listings(listings: list[dict], token_budget: int = TOOL_OUTPUT_TOKEN_BUDGET) -> list[dict]:
+    """
+    Reduce scraped listings to what the agents use, with numeric price and
+    rating, de-duplicated by `listing_key`, best-rated first, cut to
+    `token_budget`.
+    """
+    projected = {}
+    for listing in listings:
+        key = listing_key(listing)
+        if key in projected:
+            continue
+        projected[key] = {
+            "title": listing.get("title"),
+            "subtitle": listing.get("subtitle"),
+            "area": listing.get("area"),
+            "nightly_price": parse_nightly_price(listing.get("price"), listing.get("nights") or 1),
+            # Averaged from a longer stay's price (see airbnb_scraper._from_wider_dates).
+            "price_estimated": listing.get("price_estimated") or None,
+            "rating": to_float(listing.get("rating")),
+            "reviews": to_int(listing.get("reviews")),
+            "url": (listing.get("url") or "N/A").split("?")[0],
+        }
+    ranked = sorted(
+        projected.values(),
+        key=lambda l: (-weighted_rating(l["rating"], l["reviews"]), l["nightly_price"] or math.inf),
+    )
+    return fit_to_budget([_drop_empty(l) for l in ranked], token_budget)
+
+
+def project_places(places: list[dict], token_budget: int = TOOL_OUTPUT_TOKEN_BUDGET) -> list[dict]:
+    """
+    Reduce Google Places results to name, address, rating, review count,
+    price level and a couple of meaningful types (no photos, geometry or
+    opening hours), de-duplicated, best-rated first, cut to `token_budget`.
+    """
+    projected = {}
+    for place in places:
+        key = place.get("place_id") or place.get("name")
+        if not key or key in projected:
+            continue
+        projected[key] = {
+            "name": place.get("name"),
+            "address": place.get("formatted_address"),
+            "rating": to_float(place.get("rating")),
+            "reviews": to_int(place.get("user_ratings_total")),
+            "price_level": place.get("price_level"),
+            "types": [t for t in place.get("types", []) if t not in _GENERIC_PLACE_TYPES][:3],
+        }
+    ranked = sorted(projected.values(), key=lambda p: -weighted_rating(p["rating"], p["reviews"]))
+    return fit_to_budget([_drop_empty(p) for p in ranked], token_budget)
+
+
+def truncate_text(text: str, token_budget: int = AGENT_OUTPUT_TOKEN_BUDGET) -> str:
+    """Trim free text to roughly `token_budget` tokens, cutting at a line break when possible."""
+    limit = token_budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut].rstrip() + "\n[...truncated]"
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+
+from Agent_Input import AccommodationRequest, guess_destination, looks_like_trip_request
+from browser_pool import browser_pool
+from Research_dest import fetch_attractions, normalize_destination
+
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "1") == "1"
+
+
+class SpeculationStats:
+    def __init__(self):
+        self.started = 0
+        self.hits = 0          # guessed destination matched the extraction
+        self.wrong_guess = 0   # trip planning, but for another destination
+        self.discarded = 0     # general_info or extraction failed
+        self.seconds_saved = 0.0
+
+    def stats(self) -> dict:
+        resolved = self.hits + self.wrong_guess + self.discarded
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "wrong_guess": self.wrong_guess,
+            "discarded": self.discarded,
+            "hit_rate": round(self.hits / resolved, 3) if resolved else 0.0,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+class Speculation:
+    """
+    Starts the Places lookup and browser warm-up for the destination guessed
+    from the raw query while intent classification and extraction are still
+    running. The lookup goes through `places_cache`, so when the guess is right
+    the real lookup later joins the in-flight call or hits the cache.
+
+    Cancelling doesn't stop a Places request already sent (the cache shields
+    its loaders), so only queries that already look like trip requests (dates
+    or a party size, and not a question) are speculated on; "best time to
+    visit Bali?" costs no Places call.
+
+    Usage:
+        speculation = Speculation(user_query)
+        intent, validated = await understand_query(user_query)  # on error: speculation.discard()
+        speculation.resolve(intent, validated)
+    """
+
+    def __init__(self, user_query: str):
+        self.destination = None
+        if SPECULATIVE_PREFETCH and looks_like_trip_request(user_query):
+            self.destination = guess_destination(user_query)
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        if self.destination:
+            speculation_stats.started += 1
+            self.task = asyncio.create_task(self._prefetch())
+
+    async def _prefetch(self):
+        await asyncio.gather(
+            fetch_attractions(self.destination),
+            # Never interrupt a browser launch halfway.
+            asyncio.shield(browser_pool.start()),
+            return_exceptions=True,
+        )
+        self.finished_at = time.perf_counter()
+
+    def resolve(self, intent: str, validated: AccommodationRequest | None):
+        """Record whether the speculative work will be used, and drop it if not."""
+        if self.task is None:
+            return
+        if intent == "general_info" or validated is None:
+            self.discard()
+        elif normalize_destination(validated.destination) != normalize_destination(self.destination):
+            speculation_stats.wrong_guess += 1
+            self.task.cancel()
+        else:
+            speculation_stats.hits += 1
+            # The prefetch overlapped extraction for this long.
+            speculation_stats.seconds_saved += (self.finished_at or time.perf_counter()) - self.started_at
+        self.task = None
+
+    def discard(self):
+        if self.task is not None:
+            speculation_stats.discarded += 1
+            self.task.cancel()
+            self.task = None
@@ -4,6 +4,8 @@ from agents import Agent, Runner, set_tracing_disabled
 from agents.extensions.models.litellm_model import LitellmModel
 from Agent_Input import extract_query_data, AccommodationRequest
 from airbnb_scraper import scrape_airbnb
+from browser_pool import browser_pool
+from observability import get_logger, setup_logging, shutdown_logging, timed
 from Research_dest import research_destination
 from pydantic import BaseModel, ValidationError
 from groq import Groq
@@ -18,25 +20,16 @@ if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
-# ANSI Color Codes
-class Colors:
-    HEADER = '\033[95m'      # Purple
-    BLUE = '\033[94m'        # Blue
-    GREEN = '\033[92m'       # Green
-    YELLOW = '\033[93m'      # Yellow
-    RED = '\033[91m'         # Red
-    ENDC = '\033[0m'         # Reset color
-    BOLD = '\033[1m'         # Bold
-    UNDERLINE = '\033[4m'    # Underline
-
 load_dotenv()
+setup_logging()
+log = get_logger("supervisor")
 
 
 set_tracing_disabled(disabled=True)
 # env variable
 GROQ_API_KEY=os.getenv("GROQ_API_KEY")
 MODEL=os.getenv("MODEL")
-print(MODEL)
+log.info("Using model %s", MODEL)
 
 # 🔷 User input
 user_query = (
@@ -46,7 +39,7 @@ user_query = (
 
 # 🔷 Run extraction + validation
 try:
-    extracted_data = extract_query_data(user_query)
+    extracted_data = asyncio.run(extract_query_data(user_query))
 #     extracted_data = {
 #     "destination": "Dubai",
 #     "check_in": "2025-08-10",
@@ -82,7 +75,7 @@ try:
     if num_nights <= 0:
         raise ValueError("Check-out date must be after check-in date.")
 except (ValueError, TypeError) as e:
-    print(f"{Colors.RED}Error parsing dates: {e}{Colors.ENDC}")
+    log.error("Error parsing dates: %s", e)
     exit()
 
 duration = f"{num_nights} nights ({check_in_str} to {check_out_str})"
@@ -97,9 +90,12 @@ accommodation_budget_ratio = 0.6
 max_accom_budget = max_total_budget * accommodation_budget_ratio
 max_nightly_price = int(max_accom_budget / num_nights) if num_nights > 0 else max_accom_budget
 
-print(f"{Colors.BLUE}Calculated trip duration: {num_nights} nights.{Colors.ENDC}")
-print(f"{Colors.BLUE}Overall trip budget: ${min_total_budget}-${max_total_budget}.{Colors.ENDC}")
-print(f"{Colors.BLUE}Derived max nightly accommodation price for search: ${max_nightly_price} (using {accommodation_budget_ratio*100:.0f}% of max total).{Colors.ENDC}")
+log.info("Calculated trip duration: %d nights", num_nights)
+log.info("Overall trip budget: $%s-$%s", min_total_budget, max_total_budget)
+log.info(
+    "Derived max nightly accommodation price for search: $%s (using %.0f%% of max total)",
+    max_nightly_price, accommodation_budget_ratio * 100,
+)
 
 
 # Define agents
@@ -149,24 +145,22 @@ budget_optimizer = Agent(
 )
 
 async def main():
-    print(f"{Colors.HEADER}{Colors.BOLD}=== Supervisor Agent Started ==={Colors.ENDC}")
-    print(f"{Colors.BLUE}Agents are running...{Colors.ENDC}\n")
+    log.info("Supervisor agent started")
+    t0 = time.perf_counter()
 
-    t0 = time.time()
+    async def run_timed(agent, input):
+        with timed("agent", agent.name):
+            return await Runner.run(agent, input)
 
     # Run planner & accommodation in parallel
-    print(f"{Colors.BLUE}[SUPERVISOR] Launching Experience Planner and Accommodation agents in parallel...{Colors.ENDC}")
-    planner_start = time.time()
-    planner_task = Runner.run(experience_planner, destination)
-    accom_start = time.time()
-    accom_task = Runner.run(accommodation_agent, "Find accommodations for the specified parameters in the instructions")
-
-    planner_result, accommodation_result = await asyncio.gather(planner_task, accom_task)
-    print(f"{Colors.GREEN}[SUPERVISOR] Experience Planner completed in {time.time()-planner_start:.2f}s{Colors.ENDC}")
-    print(f"{Colors.GREEN}[SUPERVISOR] Accommodation Agent completed in {time.time()-accom_start:.2f}s{Colors.ENDC}")
+    log.info("Launching Experience Planner and Accommodation agents in parallel")
+    planner_result, accommodation_result = await asyncio.gather(
+        run_timed(experience_planner, destination),
+        run_timed(accommodation_agent, "Find accommodations for the specified parameters in the instructions"),
+    )
 
-    print(f"\n{Colors.GREEN}✅ Planner Output (truncated):{Colors.ENDC}\n", str(planner_result.final_output)[:500], "...\n")
-    print(f"\n{Colors.GREEN}✅ Accommodation Output (truncated):{Colors.ENDC}\n", str(accommodation_result.final_output)[:500], "...\n")
+    print("\n✅ Planner Output (truncated):\n", str(planner_result.final_output)[:500], "...\n")
+    print("\n✅ Accommodation Output (truncated):\n", str(accommodation_result.final_output)[:500], "...\n")
 
     # Combine results & pass to Budget Optimizer
     combined_input = (
@@ -178,13 +172,18 @@ async def main():
         f"within the specified total budget constraints. Include a day-by-day cost breakdown and a final total."
     )
 
-    print(f"{Colors.BLUE}[SUPERVISOR] Launching Budget Optimizer agent...{Colors.ENDC}")
-    budget_start = time.time()
-    budget_result = await Runner.run(budget_optimizer, combined_input)
-    print(f"{Colors.GREEN}[SUPERVISOR] Budget Optimizer completed in {time.time()-budget_start:.2f}s{Colors.ENDC}")
+    log.info("Launching Budget Optimizer agent")
+    budget_result = await run_timed(budget_optimizer, combined_input)
+
+    print("\n✅ Final Budget-Optimized Plan:\n", budget_result.final_output)
+    log.info("Supervisor agent finished in %.2fs", time.perf_counter() - t0)
 
-    print(f"\n{Colors.GREEN}✅ Final Budget-Optimized Plan:{Colors.ENDC}\n", budget_result.final_output)
-    print(f"{Colors.HEADER}{Colors.BOLD}=== Supervisor Agent Finished in {time.time()-t0:.2f}s ==={Colors.ENDC}")
+async def run():
+    try:
+        await main()
+    finally:
+        await browser_pool.stop()
+        shutdown_logging()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from playwright.async_api import Error as PlaywrightError, async_playwright
+
+import airbnb_scraper
+
+FIXTURES = sorted((Path(__file__).parent / "fixtures" / "airbnb").glob("*.html"))
+
+
+async def _extract(html_pages: list[str]) -> list[list[dict]]:
+    """Parsed listings per page, using whatever `EXTRACTION_MODE` is set."""
+    async with async_playwright() as playwright:
+        try:
+            browser = await playwright.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f"Chromium is not available: {e}")
+        try:
+            page = await browser.new_page()
+            results = []
+            for html in html_pages:
+                await page.set_content(html)
+                raw_cards = await airbnb_scraper._extract_raw_cards(page)
+                results.append([
+                    airbnb_scraper._parse_card(raw, "Paris", "2025-09-15", "2025-09-20", 5) for raw in raw_cards
+                ])
+            return results
+        finally:
+            await browser.close()
+
+
+def test_fixtures_exist():
+    assert FIXTURES
+
+
+def test_bulk_and_per_card_extraction_agree(monkeypatch):
+    html_pages = [path.read_text(encoding="utf-8") for path in FIXTURES]
+
+    monkeypatch.setattr(airbnb_scraper, "EXTRACTION_MODE", "bulk")
+    bulk = asyncio.run(_extract(html_pages))
+    monkeypatch.setattr(airbnb_scraper, "EXTRACTION_MODE", "per_card")
+    per_card = asyncio.run(_extract(html_pages))
+
+    assert bulk == per_card
+    for path, listings in zip(FIXTURES, bulk):
+        assert listings, f"no cards extracted from {path.name}"
+        assert all(listing["title"] != "N/A" and listing["price"] != "N/A" for listing in listings)
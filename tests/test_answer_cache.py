@@ -0,0 +1,30 @@
+import pytest
+
+from answer_cache import SemanticAnswerCache
+
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache("test", ttl=60, max_entries=100, threshold=0.8)
+
+
+def test_near_duplicate_question_reuses_the_answer(cache):
+    cache.set("What are the best beaches in Bali?", "Uluwatu")
+    assert cache.get("what are the best beach in bali") == "Uluwatu"
+    assert cache.get("Please tell me: what are the best beaches in Bali?") == "Uluwatu"
+
+
+@pytest.mark.parametrize("question", [
+    "Where should I visit in Bali?",
+    "Why visit Bali?",
+    "How do I visit Bali?",
+])
+def test_different_question_words_do_not_match(cache, question):
+    cache.set("When should I visit Bali?", "Dry season")
+    assert cache.get(question) is None
+
+
+def test_direction_matters(cache):
+    cache.set("Best way to get from Paris to Rome", "Night train")
+    assert cache.get("Best way to get from Rome to Paris") is None
+    assert cache.get("Paris to Rome") is None
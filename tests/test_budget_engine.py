@@ -0,0 +1,51 @@
+import itertools
+import math
+import random
+
+import pytest
+
+import budget_engine
+from budget_engine import COST_STEP, estimate_activities, optimize_budget
+
+
+def _places(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        {"name": f"place {i}", "rating": round(rng.uniform(3, 5), 1), "reviews": rng.randint(1, 5000),
+         "price_level": rng.choice([None, 0, 1, 2, 3, 4])}
+        for i in range(n)
+    ]
+
+
+def _brute_force_value(activities, max_count, budget):
+    best = 0.0
+    for size in range(max_count + 1):
+        for combo in itertools.combinations(activities, size):
+            if sum(math.ceil(a.cost / COST_STEP) for a in combo) * COST_STEP <= budget:
+                best = max(best, sum(a.value for a in combo))
+    return best
+
+
+@pytest.mark.parametrize("nights", [2, 5])  # count limit binds / doesn't
+def test_chosen_activities_are_optimal(monkeypatch, nights):
+    monkeypatch.setattr(budget_engine, "ACTIVITIES_PER_DAY", 2)
+    places = _places(8)
+    listing = {"title": "stay", "nightly_price": 100, "rating": 4.5, "reviews": 50}
+    stay = 100 * nights
+    for max_budget in (stay + 100, stay + 250, stay + 500, stay + 5000):
+        plan = optimize_budget([listing], places, guests=2, nights=nights, check_in="2025-09-01",
+                               min_budget=0, max_budget=max_budget, preference="standard", accommodation_ratio=None)
+        chosen = {a["name"] for day in plan.days for a in day.activities}
+        activities = sorted(estimate_activities(places, 2, "standard"), key=lambda a: -a.value)
+        value = sum(a.value for a in activities if a.name in chosen)
+        assert plan.total <= max_budget
+        assert math.isclose(value, _brute_force_value(activities, 2 * nights, max_budget - stay))
+
+
+def test_long_trip_with_many_places_stays_within_budget():
+    listings = [{"title": f"stay {i}", "nightly_price": 50 + 20 * i, "rating": 4.5, "reviews": 100} for i in range(30)]
+    plan = optimize_budget(listings, _places(60), guests=2, nights=30, check_in="2025-09-01",
+                           min_budget=1000, max_budget=30000, preference="luxury")
+    assert plan is not None
+    assert plan.within_budget
+    assert sum(len(day.activities) for day in plan.days) <= 60
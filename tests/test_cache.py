@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+from cache import MemoryBackend, SQLiteBackend, TTLCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache("test", MemoryBackend(), ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert calls == 1
+
+
+def test_joined_load_is_checked_against_accept():
+    cache = TTLCache("test", MemoryBackend(), ttl=60)
+
+    async def small():
+        await asyncio.sleep(0.05)
+        return [1]
+
+    async def large():
+        return [1, 2, 3]
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_load("k", small))
+        await asyncio.sleep(0)
+        second = await cache.get_or_load("k", large, accept=lambda value: len(value) >= 3)
+        return await first, second
+
+    assert asyncio.run(main()) == ([1], [1, 2, 3])
+    assert cache.rejected_loads == 1
+
+
+def test_sqlite_backend_runs_off_the_event_loop(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), "test")
+    threads = set()
+    get = backend.get
+
+    def recording_get(key):
+        threads.add(threading.get_ident())
+        return get(key)
+
+    backend.get = recording_get
+    cache = TTLCache("test", backend, ttl=60)
+
+    async def main():
+        await cache.set("k", {"a": 1})
+        return await cache.get("k"), threading.get_ident()
+
+    value, loop_thread = asyncio.run(main())
+    assert value == {"a": 1}
+    assert threads and loop_thread not in threads
@@ -0,0 +1,66 @@
+from datetime import date
+
+from Agent_Input import _parse_budget, fast_parse_query, guess_destination, looks_like_trip_request
+
+TODAY = date(2025, 6, 1)
+BASE = "luxury stay in Dubai from Aug 10 to Aug 15 for 2 guests, budget between 1000 and 3000"
+
+
+def test_parses_a_fully_specified_query():
+    parsed = fast_parse_query(BASE, today=TODAY)
+    assert parsed is not None
+    assert parsed.destination == "Dubai"
+    assert (parsed.check_in, parsed.check_out) == ("2025-08-10", "2025-08-15")
+    assert (parsed.guests, parsed.min_budget, parsed.max_budget, parsed.standard) == (2, 1000, 3000, "luxury")
+
+
+def test_two_places_fall_back_to_the_llm():
+    query = "I live in London. " + BASE
+    assert guess_destination(query) is None
+    assert fast_parse_query(query, today=TODAY) is None
+
+
+def test_repeated_place_is_still_one_destination():
+    assert guess_destination("Stay in Dubai, then more time in Dubai") == "Dubai"
+
+
+def test_per_night_amounts_are_not_a_total_budget():
+    query = "luxury stay in Dubai from Aug 10 to Aug 15 for 2 guests, budget $200-$300 per night"
+    assert fast_parse_query(query, today=TODAY) is None
+    query = "luxury stay in Dubai from Aug 10 to Aug 15 for 2 guests, budget between 1000 and 3000 per person"
+    assert fast_parse_query(query, today=TODAY) is None
+
+
+def test_non_usd_budget_falls_back_to_the_llm():
+    query = "luxury stay in Dubai from Aug 10 to Aug 15 for 2 guests, budget between 1000 and 3000 AED"
+    assert fast_parse_query(query, today=TODAY) is None
+    query = "luxury stay in Dubai from Aug 10 to Aug 15 for 2 guests, budget between €1000 and €3000"
+    assert fast_parse_query(query, today=TODAY) is None
+
+
+def test_words_starting_with_k_are_not_thousands():
+    assert _parse_budget("budget $800 to $1200 kid friendly") == (800, 1200)
+    assert _parse_budget("budget 1500-2500 keeping it simple") == (1500, 2500)
+    assert _parse_budget("between 1500 and 2500 kindly") == (1500, 2500)
+    assert _parse_budget("budget 2-3k") == (2000, 3000)
+    query = "luxury stay in Dubai from Aug 10 to Aug 15 for 2 guests, budget $800 to $1200 kid friendly"
+    parsed = fast_parse_query(query, today=TODAY)
+    assert parsed is not None and (parsed.min_budget, parsed.max_budget) == (800, 1200)
+
+
+def test_kroner_and_day_numbers_are_not_usd_budgets():
+    assert _parse_budget("budget 2000 to 3000 kroner") is None
+    assert _parse_budget("between 1 and 15 Aug") is None
+
+
+def test_questions_fall_back_to_the_llm():
+    query = "Can you tell me about luxury hotels in Dubai from Aug 10 to Aug 15 for 2 guests, budget between 1000 and 3000"
+    assert fast_parse_query(query, today=TODAY) is None
+    assert fast_parse_query(BASE + "?", today=TODAY) is None
+
+
+def test_only_trip_requests_are_worth_speculating_on():
+    assert looks_like_trip_request("Plan a trip to Bali from Aug 10 to Aug 15", today=TODAY)
+    assert looks_like_trip_request("Somewhere nice in Bali for 3 guests", today=TODAY)
+    assert not looks_like_trip_request("best time to visit Bali", today=TODAY)
+    assert not looks_like_trip_request("Can we go to Bali from Aug 10 to Aug 15?", today=TODAY)
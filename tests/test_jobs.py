@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+from cache import SQLiteBackend
+from jobs import SUCCEEDED, JobQueue, JobStore
+
+
+def test_sqlite_job_store_runs_off_the_event_loop(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "jobs.sqlite3"), "jobs")
+    threads = set()
+    set_ = backend.set
+
+    def recording_set(*args):
+        threads.add(threading.get_ident())
+        return set_(*args)
+
+    backend.set = recording_set
+
+    async def runner(query, plan_id):
+        yield "plan", {"query": query}
+
+    async def main():
+        queue = JobQueue(JobStore(backend), runner)
+        queue.start()
+        job = await queue.submit("Dubai in August")
+        await queue._queue.join()
+        await queue.stop()
+        return await queue.get(job.id), threading.get_ident()
+
+    job, loop_thread = asyncio.run(main())
+    assert job.status == SUCCEEDED
+    assert job.result == {"plan": {"query": "Dubai in August"}}
+    assert threads and loop_thread not in threads
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import airbnb_scraper
+from airbnb_scraper import _from_wider_dates, _merge_index, _remember_range, listing_cache, listing_cache_key
+
+
+def _listings(count, total_price, nights):
+    return [
+        {"title": f"stay {i}", "price": f"${total_price} total", "url": f"https://www.airbnb.com/rooms/{i}",
+         "rating": "4.8", "reviews": "20", "area": "Centre", "nights": nights}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def clean_index():
+    airbnb_scraper._indexed_ranges.clear()
+    yield
+    for key in list(airbnb_scraper._indexed_ranges):
+        listing_cache.backend.delete(listing_cache_key("Lisbon", key[1], key[2], key[3]))
+    airbnb_scraper._indexed_ranges.clear()
+
+
+def _index(check_in, check_out, nights, total_price=500, count=10):
+    asyncio.run(listing_cache.set(
+        listing_cache_key("Lisbon", 2, check_in, check_out),
+        _merge_index(None, 1000, count, _listings(count, total_price, nights), nights),
+    ))
+    _remember_range("Lisbon", 2, check_in, check_out)
+
+
+def test_contained_range_is_answered_with_estimated_prices():
+    _index("2025-09-10", "2025-09-15", 5)
+    listings = asyncio.run(_from_wider_dates("Lisbon", 2, 200, "2025-09-11", "2025-09-13", limit=5))
+    assert len(listings) == 5
+    assert all(l["price"] == "$100.00 night" and l["price_estimated"] for l in listings)
+    assert all(l["check_in"] == "2025-09-11" and l["nights"] == 2 for l in listings)
+
+
+def test_expired_ranges_are_pruned():
+    _index("2025-09-10", "2025-09-15", 5)
+    listing_cache.backend.delete(listing_cache_key("Lisbon", 2, "2025-09-10", "2025-09-15"))
+    assert asyncio.run(_from_wider_dates("Lisbon", 2, 200, "2025-09-11", "2025-09-13", limit=5)) is None
+    assert not airbnb_scraper._indexed_ranges
+
+
+def test_weekly_stay_average_is_not_used_for_a_short_stay():
+    _index("2025-09-01", "2025-09-08", 7, total_price=700)
+    assert asyncio.run(_from_wider_dates("Lisbon", 2, 200, "2025-09-02", "2025-09-04", limit=5)) is None
+
+
+def test_remembered_ranges_are_bounded(monkeypatch):
+    monkeypatch.setattr(listing_cache.backend, "max_entries", 3)
+    for day in range(10, 16):
+        _remember_range("Lisbon", 2, f"2025-09-{day}", f"2025-09-{day + 1}")
+    assert len(airbnb_scraper._indexed_ranges) == 3
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+from cache import SQLiteBackend
+from plan_store import PlanStore
+
+
+def test_sqlite_plan_store_runs_off_the_event_loop(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "plans.sqlite3"), "plans")
+    threads = set()
+    get, set_ = backend.get, backend.set
+
+    def recording(method):
+        def call(*args):
+            threads.add(threading.get_ident())
+            return method(*args)
+        return call
+
+    backend.get, backend.set = recording(get), recording(set_)
+    store = PlanStore(backend, ttl=60)
+
+    async def main():
+        session = store.create({"destination": "Dubai"})
+        await store.put(session)
+        return session.id, await store.get(session.id), threading.get_ident()
+
+    plan_id, session, loop_thread = asyncio.run(main())
+    assert session.id == plan_id and session.request == {"destination": "Dubai"}
+    assert threads and loop_thread not in threads
+
+
+def test_expired_sessions_are_dropped(tmp_path):
+    store = PlanStore(SQLiteBackend(str(tmp_path / "plans.sqlite3"), "plans"), ttl=-1)
+
+    async def main():
+        session = store.create({"destination": "Dubai"})
+        await store.put(session)
+        return await store.get(session.id), len(store.backend)
+
+    assert asyncio.run(main()) == (None, 0)
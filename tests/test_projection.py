@@ -0,0 +1,27 @@
+import math
+
+from airbnb_scraper import _merge_index
+from projection import listing_key, project_listings
+
+
+def _listing(title, url="N/A", price="$120 night"):
+    return {"title": title, "subtitle": "Flat", "price": price, "url": url, "rating": "4.8", "reviews": "10", "nights": 1}
+
+
+def test_same_room_with_different_query_strings_is_one_listing():
+    a = _listing("Loft", "https://www.airbnb.com/rooms/1?check_in=2025-09-01")
+    b = _listing("Loft", "https://www.airbnb.com/rooms/1?adults=2")
+    assert listing_key(a) == listing_key(b)
+    assert len(project_listings([a, b], token_budget=math.inf)) == 1
+
+
+def test_cards_without_links_are_not_collapsed():
+    listings = [_listing("Loft"), _listing("Studio"), _listing("Loft", price="$150 night")]
+    projected = project_listings(listings, token_budget=math.inf)
+    assert len(projected) == 3
+    assert all("url" not in listing for listing in projected)
+    assert len(_merge_index(None, 200, 10, listings, 1)["listings"]) == 3
+
+
+def test_identical_linkless_cards_are_still_duplicates():
+    assert len(project_listings([_listing("Loft"), _listing("Loft")], token_budget=math.inf)) == 1
@@ -0,0 +1,269 @@
+from dataclasses import dataclass
+from datetime import datetime
+import os
+
+import httpx
+import litellm
+from agents import Agent, RunContextWrapper
+from agents.extensions.models.litellm_model import LitellmModel
+from dotenv import load_dotenv
+
+from Agent_Input import AccommodationRequest
+from airbnb_scraper import scrape_airbnb
+from governor import governor
+from llm_client import AGENT_LLM_HEDGE_AFTER, AGENT_LLM_MAX_RETRIES, LLM_OUTPUT_TOKEN_ESTIMATE, with_retries
+from projection import estimate_tokens
+from Research_dest import research_destination
+
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+MODEL = os.getenv("MODEL")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+# Every agent shares one model object and LiteLLM routes all of them through
+# one keep-alive HTTP client, so connections are reused across requests.
+litellm.aclient_session = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=60,
+    ),
+    timeout=httpx.Timeout(120, connect=10),
+)
+
+# Errors worth retrying an agent's model call for: connection problems,
+# timeouts, rate limits and 5xx.
+TRANSIENT_LLM_ERRORS = (
+    litellm.APIConnectionError,
+    litellm.Timeout,
+    litellm.RateLimitError,
+    litellm.InternalServerError,
+    litellm.BadGatewayError,
+    litellm.ServiceUnavailableError,
+)
+
+
+class GovernedLitellmModel(LitellmModel):
+    """
+    `LitellmModel` whose calls wait for the governor's LLM request and token
+    limits. Non-streamed calls are retried on transient errors and hedged
+    like `chat_completion`; streamed calls can't be retried once tokens have
+    been sent, so they aren't.
+    """
+
+    @staticmethod
+    def _estimate_tokens(system_instructions, input, model_settings) -> int:
+        prompt = (system_instructions or "") + (input if isinstance(input, str) else str(input))
+        return estimate_tokens(prompt) + (model_settings.max_tokens or LLM_OUTPUT_TOKEN_ESTIMATE)
+
+    async def get_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        tokens = self._estimate_tokens(system_instructions, input, model_settings)
+
+        async def call():
+            async with governor.llm_call(tokens):
+                return await super(GovernedLitellmModel, self).get_response(
+                    system_instructions, input, model_settings, *args, **kwargs
+                )
+
+        return await with_retries(call, TRANSIENT_LLM_ERRORS, AGENT_LLM_MAX_RETRIES, AGENT_LLM_HEDGE_AFTER, caller="agent")
+
+    async def stream_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        async with governor.llm_call(self._estimate_tokens(system_instructions, input, model_settings)):
+            async for event in super().stream_response(system_instructions, input, model_settings, *args, **kwargs):
+                yield event
+
+
+shared_model = GovernedLitellmModel(model=MODEL, api_key=GROQ_API_KEY)
+
+
+async def close_shared_http_client():
+    if litellm.aclient_session is not None:
+        await litellm.aclient_session.aclose()
+        litellm.aclient_session = None
+
+
+@dataclass
+class TripParams:
+    """Per-request trip parameters, passed to the agents as run context."""
+    destination: str
+    check_in: str
+    check_out: str
+    guests: int
+    preferences: str
+    min_total_budget: float
+    max_total_budget: float
+    num_nights: int
+    duration: str
+    max_nightly_price: int
+
+    @classmethod
+    def from_request(cls, validated: AccommodationRequest) -> "TripParams":
+        check_in_date = datetime.fromisoformat(validated.check_in)
+        check_out_date = datetime.fromisoformat(validated.check_out)
+        num_nights = (check_out_date - check_in_date).days
+        if num_nights <= 0:
+            raise ValueError("Check-out date must be after check-in date.")
+
+        accommodation_budget_ratio = 0.6
+        max_accom_budget = validated.max_budget * accommodation_budget_ratio
+        return cls(
+            destination=validated.destination,
+            check_in=validated.check_in,
+            check_out=validated.check_out,
+            guests=validated.guests,
+            preferences=validated.standard,
+            min_total_budget=validated.min_budget,
+            max_total_budget=validated.max_budget,
+            num_nights=num_nights,
+            duration=f"{num_nights} nights ({validated.check_in} to {validated.check_out})",
+            max_nightly_price=int(max_accom_budget / num_nights),
+        )
+
+
+# Instructions are a fixed prefix followed by the request's details, so the
+# prompt prefix is identical across requests and provider-side caching can hit.
+def _trip_details(params: TripParams) -> str:
+    return (
+        f"\n\nTRIP DETAILS:\n"
+        f"- Destination: {params.destination}\n"
+        f"- Guests: {params.guests}\n"
+        f"- Duration: {params.duration}\n"
+        f"- Total trip budget (accommodations and activities): ${params.min_total_budget}-${params.max_total_budget}\n"
+        f"- Preference: '{params.preferences}'"
+    )
+
+
+_ACTIVITIES_ANALYSIS = (
+    "Analyze and recommend activities suitable for the number of guests "
+    "and trip duration in the trip details, within the total budget for the trip. "
+    "Match the user's preferred experience level. "
+    "Include a variety of options for adventure, relaxation, and sightseeing with estimated costs per person."
+)
+
+_ACCOMMODATION_ANALYSIS = (
+    "Analyze and rank results based on price, guest ratings, proximity to attractions, and overall value. "
+    "Return up to 5 of the best options with clear reasoning for the user's preference."
+)
+
+EXPERIENCE_PLANNER_INSTRUCTIONS = (
+    "Use the `research_destination` tool to research and suggest engaging, "
+    "local, and culturally relevant activities and attractions in the destination given in the trip details. "
+    "The tool only requires the destination name as input. "
+    "Once you have the results: " + _ACTIVITIES_ANALYSIS
+)
+
+ACCOMMODATION_INSTRUCTIONS = (
+    "Use the `scrape_airbnb` tool to find available accommodation options. "
+    "Call the tool with exactly the tool parameters given in the trip details. "
+    + _ACCOMMODATION_ANALYSIS
+)
+
+# Used when the supervisor calls the tools itself and hands the results over,
+# so the model never has to spend a turn on the tool call.
+EXPERIENCE_ANALYST_INSTRUCTIONS = (
+    "The user message contains Google Places results for the top tourist attractions in the destination "
+    "given in the trip details. Use them to suggest engaging, local, and culturally relevant activities "
+    "and attractions. " + _ACTIVITIES_ANALYSIS
+)
+
+ACCOMMODATION_ANALYST_INSTRUCTIONS = (
+    "The user message contains Airbnb listings that match the trip details "
+    "(already filtered to the nightly price cap). " + _ACCOMMODATION_ANALYSIS
+)
+
+BUDGET_OPTIMIZER_INSTRUCTIONS = (
+    "Optimize the trip plan described in the trip details. "
+    "The total trip cost must stay within the total trip budget. "
+    "Create a day-by-day itinerary with specific costs for activities and accommodation. "
+    "Provide a final summary of the total estimated cost and confirm it fits within the budget. "
+    "IMPORTANT: Format your response using proper Markdown syntax with headers (##), bold text (**text**), "
+    "bullet points (-), and tables. Create a clear cost breakdown table with columns for Day, Activity, and Cost."
+)
+
+# Used when budget_engine has already chosen the stay and activities and done
+# the arithmetic; the model only presents the result.
+BUDGET_NARRATOR_INSTRUCTIONS = (
+    "The user message contains a computed trip budget plan as JSON: the chosen accommodation, "
+    "a day-by-day list of activities with costs for the whole group, and the totals. "
+    "Present it as a clear itinerary. Use the numbers exactly as given; do not add, remove, or re-price anything. "
+    "IMPORTANT: Format your response using proper Markdown syntax with headers (##), bold text (**text**), "
+    "bullet points (-), and tables. Create a clear cost breakdown table with columns for Day, Activity, and Cost, "
+    "then state the total and how much of the budget remains."
+)
+
+
+def experience_planner_instructions(ctx: RunContextWrapper[TripParams], agent: Agent[TripParams]) -> str:
+    return EXPERIENCE_PLANNER_INSTRUCTIONS + _trip_details(ctx.context)
+
+
+def accommodation_instructions(ctx: RunContextWrapper[TripParams], agent: Agent[TripParams]) -> str:
+    params = ctx.context
+    return ACCOMMODATION_INSTRUCTIONS + _trip_details(params) + (
+        f"\n- Tool parameters: location='{params.destination}', guests={params.guests}, "
+        f"max_price={params.max_nightly_price}, check_in='{params.check_in}', check_out='{params.check_out}'"
+    )
+
+
+def experience_analyst_instructions(ctx: RunContextWrapper[TripParams], agent: Agent[TripParams]) -> str:
+    return EXPERIENCE_ANALYST_INSTRUCTIONS + _trip_details(ctx.context)
+
+
+def accommodation_analyst_instructions(ctx: RunContextWrapper[TripParams], agent: Agent[TripParams]) -> str:
+    return ACCOMMODATION_ANALYST_INSTRUCTIONS + _trip_details(ctx.context)
+
+
+def budget_optimizer_instructions(ctx: RunContextWrapper[TripParams], agent: Agent[TripParams]) -> str:
+    return BUDGET_OPTIMIZER_INSTRUCTIONS + _trip_details(ctx.context)
+
+
+def budget_narrator_instructions(ctx: RunContextWrapper[TripParams], agent: Agent[TripParams]) -> str:
+    return BUDGET_NARRATOR_INSTRUCTIONS + _trip_details(ctx.context)
+
+
+experience_planner = Agent[TripParams](
+    name="Experience Planner Agent",
+    instructions=experience_planner_instructions,
+    tools=[research_destination],
+    model=shared_model,
+)
+
+accommodation_agent = Agent[TripParams](
+    name="Accommodation Agent",
+    instructions=accommodation_instructions,
+    tools=[scrape_airbnb],
+    model=shared_model,
+)
+
+experience_analyst = Agent[TripParams](
+    name="Experience Planner Agent",
+    instructions=experience_analyst_instructions,
+    model=shared_model,
+)
+
+accommodation_analyst = Agent[TripParams](
+    name="Accommodation Agent",
+    instructions=accommodation_analyst_instructions,
+    model=shared_model,
+)
+
+budget_optimizer = Agent[TripParams](
+    name="Budget Optimizer Agent",
+    instructions=budget_optimizer_instructions,
+    model=shared_model,
+)
+
+budget_narrator = Agent[TripParams](
+    name="Budget Optimizer Agent",
+    instructions=budget_narrator_instructions,
+    model=shared_model,
+)
+
+general_info_agent = Agent(
+    name="General Info Agent",
+    instructions=(
+        "Answer the user's question about travel in a helpful and concise way. "
+        "Do not assume they want to book anything. If relevant, mention attractions, best times to visit, culture, or travel tips."
+    ),
+    model=shared_model,
+)